@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pipeline de áudio em processo para os alarmes do IFPB
+Decodifica o MP3 em blocos PCM, mistura o som de aviso (chime),
+aplica fade-in/fade-out e reduz o volume (ducking) durante anúncios,
+sem iniciar processos externos.
+"""
+
+import math
+import threading
+import time
+import wave
+from collections import deque
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    import miniaudio
+    DECODER_AVAILABLE = True
+except ImportError:
+    DECODER_AVAILABLE = False
+
+try:
+    import alsaaudio
+    ALSA_AVAILABLE = True
+except ImportError:
+    ALSA_AVAILABLE = False
+
+# O pipeline só funciona com NumPy e com o decodificador de MP3
+PIPELINE_AVAILABLE = NUMPY_AVAILABLE and DECODER_AVAILABLE
+
+# Configurações
+SAMPLE_RATE = 44100
+CHANNELS = 2
+CHUNK_FRAMES = 4096  # ~93 ms por bloco a 44.1 kHz
+FADE_IN = 2.0  # segundos
+FADE_OUT = 3.0  # segundos
+DUCK_GAIN = 0.25  # volume da música durante anúncios
+DUCK_RAMP = 0.3  # segundos para chegar ao volume reduzido
+CHIME_OVERLAP = 0.5  # segundos do fim do chime misturados com o início da música
+
+
+class NullSink:
+    """Saída descartável: apenas conta os quadros recebidos (útil para testes)"""
+
+    def __init__(self):
+        self.frames_written = 0
+        self.channels = CHANNELS
+
+    def open(self, sample_rate, channels):
+        self.channels = channels
+        self.frames_written = 0
+
+    def write(self, data):
+        self.frames_written += len(data) // (2 * self.channels)
+
+    def close(self):
+        pass
+
+
+class WavSink:
+    """Saída para arquivo WAV (PCM 16 bits), sem necessidade de hardware de som"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.wav_file = None
+
+    def open(self, sample_rate, channels):
+        self.wav_file = wave.open(self.path, 'wb')
+        self.wav_file.setnchannels(channels)
+        self.wav_file.setsampwidth(2)
+        self.wav_file.setframerate(sample_rate)
+
+    def write(self, data):
+        self.wav_file.writeframesraw(data)
+
+    def close(self):
+        if self.wav_file:
+            self.wav_file.close()
+            self.wav_file = None
+
+
+class AlsaSink:
+    """Saída direta para o ALSA (a escrita bloqueante dita o ritmo da reprodução)"""
+
+    def __init__(self, device='default'):
+        self.device = device
+        self.pcm = None
+
+    def open(self, sample_rate, channels):
+        self.pcm = alsaaudio.PCM(
+            type=alsaaudio.PCM_PLAYBACK,
+            device=self.device,
+            channels=channels,
+            rate=sample_rate,
+            format=alsaaudio.PCM_FORMAT_S16_LE,
+            periodsize=CHUNK_FRAMES
+        )
+
+    def write(self, data):
+        self.pcm.write(data)
+
+    def close(self):
+        if self.pcm:
+            self.pcm.close()
+            self.pcm = None
+
+
+def default_sink():
+    """Retorna a saída padrão: ALSA se disponível, senão None"""
+    if ALSA_AVAILABLE:
+        return AlsaSink()
+    return None
+
+
+def make_chime(sample_rate=SAMPLE_RATE, channels=CHANNELS):
+    """Gera o chime "ding-dong" pré-decodificado (float32, formato quadros x canais)"""
+    tones = [(659.25, 0.6), (523.25, 0.9)]  # Mi5, Dó5
+    parts = []
+    for freq, seconds in tones:
+        t = np.arange(int(sample_rate * seconds), dtype=np.float32) / sample_rate
+        envelope = np.exp(-4.0 * t / seconds)
+        # Fundamental + harmônico leve para soar como sino
+        tone = np.sin(2 * math.pi * freq * t) + 0.3 * np.sin(4 * math.pi * freq * t)
+        parts.append((0.5 * tone * envelope).astype(np.float32))
+    mono = np.concatenate(parts)
+    return np.repeat(mono[:, None], channels, axis=1)
+
+
+def load_clip(path, sample_rate=SAMPLE_RATE, channels=CHANNELS):
+    """Decodifica um arquivo curto (chime, anúncio) de uma vez para float32"""
+    decoded = miniaudio.decode_file(
+        str(path),
+        output_format=miniaudio.SampleFormat.SIGNED16,
+        nchannels=channels,
+        sample_rate=sample_rate
+    )
+    samples = np.frombuffer(decoded.samples, dtype=np.int16).reshape(-1, channels)
+    return samples.astype(np.float32) / 32768.0
+
+
+class AudioPipeline:
+    """Reproduz alarmes em uma thread, processando o áudio em blocos reutilizados"""
+
+    def __init__(self, sink_factory=default_sink, chime=None,
+                 sample_rate=SAMPLE_RATE, channels=CHANNELS, chunk_frames=CHUNK_FRAMES):
+        self.sink_factory = sink_factory
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.chunk_frames = chunk_frames
+        self.chime = chime if chime is not None else make_chime(sample_rate, channels)
+
+        self.thread = None
+        self.stop_event = threading.Event()  # um por thread de áudio (ver start)
+        self.lock = threading.Lock()  # estado compartilhado com a thread de áudio
+        self.control_lock = threading.Lock()  # início/parada da thread (Tk e pool de TTS)
+        self.mixing = False  # há um gerador ativo que ainda vai mixar a voz?
+        self.duck_until = 0.0  # instante (monotonic) até o qual o volume fica reduzido
+        self.current_gain = 1.0
+        self.voices = deque()  # anúncios falados na fila (float32); o primeiro está tocando
+        self.voice_pos = 0  # posição no primeiro anúncio da fila
+
+        # Buffers reutilizados a cada bloco (evita alocações no laço de áudio)
+        self.ramp = np.arange(chunk_frames, dtype=np.float32)
+        self.gain = np.empty(chunk_frames, dtype=np.float32)
+        self.tmp = np.empty(chunk_frames, dtype=np.float32)
+        self.mix = np.empty((chunk_frames, channels), dtype=np.float32)
+        self.out = np.empty((chunk_frames, channels), dtype=np.int16)
+
+    def is_playing(self):
+        """Indica se há uma reprodução em andamento"""
+        return self.thread is not None and self.thread.is_alive()
+
+    def play(self, path, duration):
+        """Inicia a reprodução de chime + música por `duration` segundos"""
+        with self.control_lock:
+            self.halt()
+            sink = self.sink_factory()
+            if sink is None:
+                raise RuntimeError("Nenhuma saída de áudio disponível")
+            self.start(self.generate(path, duration), sink)
+
+    def say(self, path):
+        """Reproduz um anúncio falado, mixado sobre a música (reduzida) se houver alarme"""
+        samples = load_clip(path, self.sample_rate, self.channels)
+        with self.control_lock:
+            with self.lock:
+                self.voices.append(samples)  # toca depois dos anúncios já na fila
+                queued = sum(len(voice) for voice in self.voices) - self.voice_pos
+                self.duck_until = max(self.duck_until, time.monotonic() + queued / self.sample_rate + 0.5)
+                if self.mixing:
+                    return  # o laço em andamento mixa a voz
+            self.halt()
+            try:
+                sink = self.sink_factory()
+                if sink is None:
+                    raise RuntimeError("Nenhuma saída de áudio disponível")
+                self.start(self.generate_voice(), sink)
+            except Exception:
+                with self.lock:
+                    self.voices.clear()  # não deixar o anúncio para o próximo alarme
+                    self.voice_pos = 0
+                raise
+
+    def start(self, blocks, sink):
+        """Inicia a thread de áudio para os blocos dados (com control_lock)"""
+        if self.is_playing():
+            # Thread anterior presa (ex.: escrita no ALSA travada): não dividir os buffers com ela
+            sink.close()
+            raise RuntimeError("A thread de áudio anterior ainda não terminou")
+        # Evento novo: o evento da thread anterior continua sinalizado
+        self.stop_event = threading.Event()
+        with self.lock:
+            self.mixing = True
+        self.thread = threading.Thread(
+            target=self.render,
+            args=(blocks, sink, self.stop_event),
+            daemon=True
+        )
+        self.thread.start()
+
+    def halt(self):
+        """Encerra a thread de áudio, se houver (com control_lock)"""
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join(timeout=2)
+            if self.thread.is_alive():
+                print("Aviso: thread de áudio não terminou em 2 s")
+            else:
+                self.thread = None
+        with self.lock:
+            self.mixing = False
+
+    def stop(self):
+        """Interrompe a reprodução em andamento, inclusive o anúncio falado"""
+        with self.control_lock:
+            self.halt()
+            with self.lock:
+                self.voices.clear()
+                self.voice_pos = 0
+
+    def duck(self, seconds):
+        """Reduz o volume da música por alguns segundos (ex.: anúncio MQTT)"""
+        with self.lock:
+            self.duck_until = max(self.duck_until, time.monotonic() + seconds)
+
+    def render(self, blocks, sink, stop_event):
+        """Laço da thread de áudio: envia os blocos gerados para a saída"""
+        try:
+            sink.open(self.sample_rate, self.channels)
+            for block in blocks:
+                if stop_event.is_set():
+                    break
+                sink.write(block)
+        except Exception as e:
+            print(f"Erro no pipeline de áudio: {e}")
+        finally:
+            with self.lock:
+                if self.thread is threading.current_thread():
+                    self.mixing = False  # gerador abandonado: o próximo anúncio abre outra thread
+            try:
+                sink.close()
+            except Exception as e:
+                print(f"Erro ao fechar saída de áudio: {e}")
+
+    def decode(self, path):
+        """Gera blocos int16 (quadros x canais) decodificados do arquivo"""
+        stream = miniaudio.stream_file(
+            str(path),
+            output_format=miniaudio.SampleFormat.SIGNED16,
+            nchannels=self.channels,
+            sample_rate=self.sample_rate,
+            frames_to_read=self.chunk_frames
+        )
+        for samples in stream:
+            yield np.frombuffer(samples, dtype=np.int16).reshape(-1, self.channels)
+
+    def generate(self, path, duration):
+        """Gera os bytes PCM finais: chime, música com fades e ducking"""
+        overlap = min(int(CHIME_OVERLAP * self.sample_rate), len(self.chime))
+        solo = len(self.chime) - overlap
+
+        # 1. Parte inicial do chime, sozinha
+        for start in range(0, solo, self.chunk_frames):
+            end = min(start + self.chunk_frames, solo)
+            mix = self.mix[:end - start]
+            np.copyto(mix, self.chime[start:end])
+            self.mix_voice(mix)
+            yield self.to_pcm(mix, end - start)
+
+        # 2. Música, com o final do chime misturado no início
+        chime_pos = solo
+        pos = 0
+        total = int(duration * self.sample_rate)
+        fade_in = max(1, int(FADE_IN * self.sample_rate))
+        fade_out = max(1, int(FADE_OUT * self.sample_rate))
+        duck_step = self.chunk_frames * (1.0 - DUCK_GAIN) / max(1.0, DUCK_RAMP * self.sample_rate)
+
+        for block in self.decode(path):
+            if pos >= total:
+                break
+            with self.lock:
+                ducked = time.monotonic() < self.duck_until
+
+            n = min(len(block), total - pos)
+            mix = self.mix[:n]
+            np.multiply(block[:n], 1.0 / 32768.0, out=mix, casting='unsafe')
+
+            # Envelope: fade-in e fade-out calculados sobre a rampa pré-alocada
+            gain = self.gain[:n]
+            tmp = self.tmp[:n]
+            np.add(self.ramp[:n], pos, out=gain)
+            np.multiply(gain, 1.0 / fade_in, out=gain)
+            np.subtract(total - pos, self.ramp[:n], out=tmp)
+            np.multiply(tmp, 1.0 / fade_out, out=tmp)
+            np.minimum(gain, tmp, out=gain)
+            np.clip(gain, 0.0, 1.0, out=gain)
+
+            # Ducking: rampa linear até o volume alvo para evitar estalos
+            target = DUCK_GAIN if ducked else 1.0
+            if target < self.current_gain:
+                next_gain = max(target, self.current_gain - duck_step)
+            else:
+                next_gain = min(target, self.current_gain + duck_step)
+            if next_gain != 1.0 or self.current_gain != 1.0:
+                np.multiply(self.ramp[:n], (next_gain - self.current_gain) / n, out=tmp)
+                np.add(tmp, self.current_gain, out=tmp)
+                np.multiply(gain, tmp, out=gain)
+            self.current_gain = next_gain
+
+            np.multiply(mix, gain[:, None], out=mix)
+
+            if chime_pos < len(self.chime):
+                m = min(n, len(self.chime) - chime_pos)
+                mix[:m] += self.chime[chime_pos:chime_pos + m]
+                chime_pos += m
+            self.mix_voice(mix)
+
+            yield self.to_pcm(mix, n)
+            pos += n
+
+        self.current_gain = 1.0
+        # 3. Restante de um anúncio que chegou perto do fim do alarme
+        yield from self.generate_voice()
+
+    def generate_voice(self):
+        """Gera os blocos dos anúncios falados na fila, tocados sem alarme"""
+        while True:
+            with self.lock:
+                if not self.voices:
+                    self.mixing = False
+                    return
+            mix = self.mix
+            mix.fill(0.0)
+            self.mix_voice(mix)
+            yield self.to_pcm(mix, len(mix))
+
+    def mix_voice(self, mix):
+        """Soma ao bloco o próximo trecho da fila de anúncios (se houver)"""
+        segments = []
+        with self.lock:
+            filled = 0
+            while self.voices and filled < len(mix):
+                voice = self.voices[0]
+                start = self.voice_pos
+                m = min(len(mix) - filled, len(voice) - start)
+                segments.append((filled, voice[start:start + m]))
+                filled += m
+                self.voice_pos = start + m
+                if self.voice_pos >= len(voice):
+                    self.voices.popleft()  # próximo anúncio continua no mesmo bloco
+                    self.voice_pos = 0
+        for offset, segment in segments:
+            mix[offset:offset + len(segment)] += segment
+
+    def to_pcm(self, samples, n):
+        """Converte float32 [-1, 1] para bytes int16 usando os buffers reutilizados"""
+        scratch = self.mix[:n]
+        np.multiply(samples, 32767.0, out=scratch)
+        np.clip(scratch, -32768, 32767, out=scratch)
+        out = self.out[:n]
+        np.copyto(out, scratch, casting='unsafe')
+        return out.tobytes()
+
+
+def main():
+    """Renderiza um alarme para WAV (ou descarta) sem precisar de hardware de som"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Renderiza um alarme pelo pipeline de áudio")
+    parser.add_argument("mp3", help="arquivo de música")
+    parser.add_argument("--wav", help="arquivo WAV de saída (padrão: saída nula)")
+    parser.add_argument("--duracao", type=float, default=30, help="duração em segundos")
+    args = parser.parse_args()
+
+    if not PIPELINE_AVAILABLE:
+        print("Erro: instale numpy e miniaudio (pip install numpy miniaudio)")
+        return 1
+
+    sink = WavSink(args.wav) if args.wav else NullSink()
+    pipeline = AudioPipeline(sink_factory=lambda: sink)
+    start = time.perf_counter()
+    sink.open(pipeline.sample_rate, pipeline.channels)
+    frames = 0
+    for block in pipeline.generate(args.mp3, args.duracao):
+        sink.write(block)
+        frames += len(block) // (2 * pipeline.channels)
+    sink.close()
+    elapsed = time.perf_counter() - start
+    print(f"{frames / pipeline.sample_rate:.1f} s de áudio gerados em {elapsed:.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
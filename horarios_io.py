@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Importação e exportação em lote dos horários de alarme
+Aceita CSV (uma coluna "hora") ou JSON (lista de "HH:MM"); todas as
+linhas são validadas antes de gravar, e a gravação usa uma única
+conexão e uma única transação (executemany).
+"""
+
+import csv
+import json
+import sqlite3
+from pathlib import Path
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS horarios (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        hora TEXT NOT NULL
+    )
+"""
+
+
+def init_database(db_name):
+    """Cria a tabela de horários, se não existir"""
+    conn = sqlite3.connect(db_name)
+    cursor = conn.cursor()
+    cursor.execute(SCHEMA)
+    conn.commit()
+    conn.close()
+
+
+def validate_hora(hora):
+    """Valida formato HH:MM"""
+    try:
+        parts = hora.split(':')
+        if len(parts) != 2:
+            return False
+        h, m = int(parts[0]), int(parts[1])
+        return 0 <= h <= 23 and 0 <= m <= 59
+    except:
+        return False
+
+
+def normalize_hora(hora):
+    """Converte "8:5" em "08:05" (a ordenação no banco é textual)"""
+    h, m = hora.split(':')
+    return f"{int(h):02d}:{int(m):02d}"
+
+
+def read_rows(path):
+    """Lê os valores brutos do arquivo: lista de (linha, texto)"""
+    path = Path(path)
+    if path.suffix.lower() == '.json':
+        with open(path, encoding='utf-8-sig') as f:  # aceita BOM (Excel, Bloco de Notas)
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get('horarios', [])
+        if not isinstance(data, list):
+            raise ValueError("JSON deve ser uma lista de horários ou {\"horarios\": [...]}")
+        return [(i + 1, str(value)) for i, value in enumerate(data)]
+
+    rows = []
+    with open(path, encoding='utf-8-sig', newline='') as f:  # aceita BOM (Excel, LibreOffice)
+        for line, row in enumerate(csv.reader(f), start=1):
+            if not row or not row[0].strip():
+                continue
+            if line == 1 and row[0].strip().lower() == 'hora':
+                continue  # cabeçalho
+            rows.append((line, row[0]))
+    return rows
+
+
+def parse_file(path):
+    """Lê e valida todas as linhas; retorna horários normalizados sem repetição"""
+    horas = []
+    errors = []
+    for line, value in read_rows(path):
+        value = value.strip()
+        if not validate_hora(value):
+            errors.append(f"linha {line}: '{value}'")
+            continue
+        hora = normalize_hora(value)
+        if hora not in horas:
+            horas.append(hora)
+    if errors:
+        raise ValueError("Horários inválidos (use HH:MM):\n" + "\n".join(errors[:20]))
+    return horas
+
+
+def insert_many(db_name, horas):
+    """Insere os horários em uma transação; retorna os que eram novos"""
+    conn = sqlite3.connect(db_name)
+    try:
+        with conn:  # commit único (ou rollback em caso de erro)
+            existing = {row[0] for row in conn.execute("SELECT hora FROM horarios")}
+            new = [hora for hora in horas if hora not in existing]
+            conn.executemany("INSERT INTO horarios (hora) VALUES (?)", [(hora,) for hora in new])
+    finally:
+        conn.close()
+    return new
+
+
+def import_file(db_name, path):
+    """Importa o arquivo; retorna (inseridos, já existentes)"""
+    horas = parse_file(path)
+    new = insert_many(db_name, horas)
+    return new, len(horas) - len(new)
+
+
+def export_file(db_name, path):
+    """Exporta os horários para CSV ou JSON (pela extensão); retorna a quantidade"""
+    conn = sqlite3.connect(db_name)
+    try:
+        horas = [row[0] for row in conn.execute("SELECT hora FROM horarios ORDER BY hora")]
+    finally:
+        conn.close()
+    path = Path(path)
+    if path.suffix.lower() == '.json':
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"horarios": horas}, f, ensure_ascii=False, indent=2)
+    else:
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['hora'])
+            writer.writerows([hora] for hora in horas)
+    return len(horas)
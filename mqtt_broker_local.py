@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Broker MQTT mínimo (3.1.1) para testes locais
+Sem dependências externas: suporta CONNECT, SUBSCRIBE (com + e #),
+PUBLISH QoS 0/1/2 de entrada, entrega com QoS até 1 e PINGREQ.
+Não usar em produção (sem autenticação, sem retain, sem sessões persistentes).
+"""
+
+import asyncio
+import struct
+import sys
+
+# Tipos de pacote MQTT
+CONNECT = 1
+PUBLISH = 3
+PUBACK = 4
+PUBREC = 5
+PUBREL = 6
+PUBCOMP = 7
+SUBSCRIBE = 8
+UNSUBSCRIBE = 10
+PINGREQ = 12
+DISCONNECT = 14
+
+
+def topic_matches(pattern, topic):
+    """Verifica se o tópico casa com o filtro (curingas + e #)"""
+    pattern_parts = pattern.split('/')
+    topic_parts = topic.split('/')
+    for i, part in enumerate(pattern_parts):
+        if part == '#':
+            return True
+        if i >= len(topic_parts):
+            return False
+        if part != '+' and part != topic_parts[i]:
+            return False
+    return len(pattern_parts) == len(topic_parts)
+
+
+def encode_length(length):
+    """Codifica o "remaining length" no formato de inteiro variável do MQTT"""
+    encoded = bytearray()
+    while True:
+        byte = length % 128
+        length //= 128
+        if length:
+            byte |= 0x80
+        encoded.append(byte)
+        if not length:
+            return bytes(encoded)
+
+
+def read_string(data, offset):
+    """Lê uma string UTF-8 prefixada pelo tamanho (2 bytes)"""
+    size = struct.unpack_from('!H', data, offset)[0]
+    start = offset + 2
+    return data[start:start + size].decode('utf-8'), start + size
+
+
+class Session:
+    """Conexão de um cliente com o broker"""
+
+    def __init__(self, broker, writer):
+        self.broker = broker
+        self.writer = writer
+        self.subscriptions = {}  # filtro -> QoS concedido
+        self.next_id = 0
+
+    def send(self, packet_type, flags, body):
+        self.writer.write(bytes([(packet_type << 4) | flags]) + encode_length(len(body)) + body)
+
+    def deliver(self, topic, payload, qos):
+        """Envia uma publicação para este cliente"""
+        topic_bytes = topic.encode('utf-8')
+        body = struct.pack('!H', len(topic_bytes)) + topic_bytes
+        if qos:
+            self.next_id = self.next_id % 65535 + 1
+            body += struct.pack('!H', self.next_id)
+        self.send(PUBLISH, qos << 1, body + payload)
+
+
+class LocalBroker:
+    """Broker assíncrono, executado por run() até Ctrl+C"""
+
+    def __init__(self, host='127.0.0.1', port=1883):
+        self.host = host
+        self.port = port
+        self.sessions = set()
+
+    async def handle(self, reader, writer):
+        session = Session(self, writer)
+        self.sessions.add(session)
+        try:
+            while True:
+                header = await reader.readexactly(1)
+                length = 0
+                multiplier = 1
+                while True:
+                    byte = (await reader.readexactly(1))[0]
+                    length += (byte & 0x7F) * multiplier
+                    multiplier *= 128
+                    if not byte & 0x80:
+                        break
+                data = await reader.readexactly(length)
+                if not self.dispatch(session, header[0] >> 4, header[0] & 0x0F, data):
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.sessions.discard(session)
+            writer.close()
+
+    def dispatch(self, session, packet_type, flags, data):
+        """Trata um pacote; retorna False para encerrar a conexão"""
+        if packet_type == CONNECT:
+            session.send(2, 0, b'\x00\x00')  # CONNACK: aceito
+        elif packet_type == PUBLISH:
+            qos = (flags >> 1) & 0x03
+            topic, offset = read_string(data, 0)
+            if qos:
+                packet_id = data[offset:offset + 2]
+                offset += 2
+                session.send(PUBACK if qos == 1 else PUBREC, 0, packet_id)
+            self.route(topic, data[offset:], qos)
+        elif packet_type == PUBREL:
+            session.send(PUBCOMP, 0, data[:2])
+        elif packet_type == SUBSCRIBE:
+            packet_id, offset = data[:2], 2
+            granted = bytearray()
+            while offset < len(data):
+                pattern, offset = read_string(data, offset)
+                qos = min(data[offset], 1)
+                offset += 1
+                session.subscriptions[pattern] = qos
+                granted.append(qos)
+            session.send(9, 0, packet_id + bytes(granted))  # SUBACK
+        elif packet_type == UNSUBSCRIBE:
+            packet_id, offset = data[:2], 2
+            while offset < len(data):
+                pattern, offset = read_string(data, offset)
+                session.subscriptions.pop(pattern, None)
+            session.send(11, 0, packet_id)  # UNSUBACK
+        elif packet_type == PINGREQ:
+            session.send(13, 0, b'')  # PINGRESP
+        elif packet_type == DISCONNECT:
+            return False
+        # PUBACK/PUBREC/PUBCOMP dos clientes: nada a fazer (sem retransmissão)
+        return True
+
+    def route(self, topic, payload, qos):
+        """Entrega a publicação a todos os assinantes do tópico"""
+        for session in list(self.sessions):
+            granted = None
+            for pattern, sub_qos in session.subscriptions.items():
+                if topic_matches(pattern, topic):
+                    granted = max(granted or 0, sub_qos)
+            if granted is not None:
+                session.deliver(topic, payload, min(qos, granted))
+
+    def run(self):
+        """Executa o broker na thread atual (bloqueia)"""
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        server = loop.run_until_complete(
+            asyncio.start_server(self.handle, self.host, self.port)
+        )
+        try:
+            loop.run_forever()
+        finally:
+            server.close()
+            loop.run_until_complete(server.wait_closed())
+            loop.close()
+
+
+def main():
+    """Uso: mqtt_broker_local.py [porta] [host]
+    Escuta só em 127.0.0.1 por padrão: sem autenticação, qualquer um na rede poderia
+    publicar nos tópicos de configuração e comando. Passe 0.0.0.0 (ou o IP da máquina)
+    apenas se o screensaver rodar em outro computador."""
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 1883
+    host = sys.argv[2] if len(sys.argv) > 2 else '127.0.0.1'
+    broker = LocalBroker(host, port)
+    print(f"Broker MQTT local em {host}:{port} (Ctrl+C para sair)")
+    try:
+        broker.run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
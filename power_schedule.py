@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modo de economia de energia baseado nos horários de alarme
+Fora da janela entre o primeiro e o último alarme do dia (com margem)
+e nos dias sem aula, a tela é apagada e os timers são suspensos.
+"""
+
+import os
+import shutil
+import subprocess
+from datetime import datetime, timedelta
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def parse_days(value):
+    """Converte "0,1,2,3,4" (0 = segunda) em conjunto de dias; inválido = todos"""
+    try:
+        days = {int(part) for part in value.split(',') if part.strip()}
+    except ValueError:
+        print(f"Aviso: dias letivos inválidos: {value!r}")
+        return set(range(7))
+    return {day for day in days if 0 <= day <= 6} or set(range(7))
+
+
+def to_minutes(hora):
+    """Converte "HH:MM" em minutos desde a meia-noite"""
+    h, m = hora.split(':')
+    return int(h) * 60 + int(m)
+
+
+def day_window(horarios, margin):
+    """Janela ativa do dia em minutos: (início, fim), ou None sem horários"""
+    minutes = [to_minutes(hora) for hora in horarios]
+    if not minutes:
+        return None
+    return max(0, min(minutes) - margin), min(MINUTES_PER_DAY, max(minutes) + margin)
+
+
+def in_active_window(now, horarios, margin, days):
+    """Indica se `now` está dentro da janela de aulas"""
+    window = day_window(horarios, margin)
+    if window is None:
+        return True  # sem horários cadastrados: nunca economizar
+    if now.weekday() not in days:
+        return False
+    minute = now.hour * 60 + now.minute
+    return window[0] <= minute <= window[1]
+
+
+def next_wake(now, horarios, margin, days):
+    """Próximo início de janela de aulas depois de `now` (ou None)"""
+    window = day_window(horarios, margin)
+    if window is None:
+        return None
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    for offset in range(8):
+        day = midnight + timedelta(days=offset)
+        if day.weekday() not in days:
+            continue
+        start = day + timedelta(minutes=window[0])
+        if start > now:
+            return start
+    return None
+
+
+def xset_available():
+    """Indica se há servidor X e o utilitário xset"""
+    return bool(os.environ.get('DISPLAY')) and shutil.which('xset') is not None
+
+
+def dpms_enabled():
+    """Estado do DPMS no servidor X: True/False, ou None se não for possível ler"""
+    if not xset_available():
+        return None
+    try:
+        output = subprocess.run(['xset', 'q'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                universal_newlines=True, timeout=5).stdout
+    except Exception as e:
+        print(f"Erro ao consultar DPMS: {e}")
+        return None
+    if "DPMS is Enabled" in output:
+        return True
+    if "DPMS is Disabled" in output:
+        return False
+    return None
+
+
+def set_display_power(on, dpms_was_enabled=None):
+    """Liga/desliga o monitor via DPMS (xset); retorna False se indisponível
+
+    `xset dpms force` também habilita o DPMS no servidor X; ao religar, passe
+    o estado lido por dpms_enabled() antes de desligar para restaurá-lo
+    (kiosks costumam rodar com -dpms, sem apagar a tela sozinhos).
+    """
+    if not xset_available():
+        return False
+    if on:
+        commands = [['xset', 'dpms', 'force', 'on'], ['xset', 's', 'reset']]
+        if dpms_was_enabled is False:
+            commands.append(['xset', '-dpms'])
+    else:
+        commands = [['xset', 'dpms', 'force', 'off']]
+    try:
+        for command in commands:
+            subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=5)
+        return True
+    except Exception as e:
+        print(f"Erro ao alterar energia do monitor: {e}")
+        return False
+
+
+def format_wake(wake, now=None):
+    """Texto curto para log: "seg 06:30" """
+    if wake is None:
+        return "indefinido"
+    now = now or datetime.now()
+    names = ["seg", "ter", "qua", "qui", "sex", "sáb", "dom"]
+    prefix = "" if wake.date() == now.date() else names[wake.weekday()] + " "
+    return prefix + wake.strftime("%H:%M")
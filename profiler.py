@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Profiler sob demanda para diagnosticar travamentos em campo
+Acionado por comando MQTT ou SIGUSR1, grava o perfil compactado em disco
+e devolve um resumo das funções mais custosas. Desligado, não tem custo:
+nada é instalado até a primeira coleta.
+
+Modos:
+- "amostragem": thread que lê a pilha de todas as threads (sys._current_frames)
+  a cada poucos milissegundos; gera pilhas colapsadas (formato flamegraph)
+- "cprofile": cProfile determinístico na thread principal (Tk); gera pstats
+"""
+
+import cProfile
+import gzip
+import os
+import pstats
+import shutil
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+SAMPLE_INTERVAL = 0.015  # segundos entre amostras (~66 Hz; leve o bastante para TV Box ARM)
+TOP_FUNCTIONS = 10
+# Funções que estão sempre na base das pilhas (ponto de entrada, laços das threads):
+# apareceriam com ~100% e tomariam o lugar das funções que interessam no resumo
+ANCESTOR_FUNCTIONS = {"<module>", "main", "run", "watch"}
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def frame_label(code):
+    """Nome legível de uma função: "animate_logo (screensaver_ifpb.py:482)" """
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def is_app_file(filename):
+    """Indica se o arquivo pertence ao programa (e não a bibliotecas)"""
+    if not filename.endswith(".py"):
+        return False  # funções nativas ("~") e código gerado
+    return os.path.dirname(os.path.abspath(filename)) == APP_DIR
+
+
+class RemoteProfiler:
+    """Executa uma coleta por vez e entrega o resumo a `publish(summary)`"""
+
+    def __init__(self, folder, keep, publish, run_on_main):
+        self.folder = Path(folder)
+        self.keep = keep
+        self.publish = publish
+        self.run_on_main = run_on_main  # agenda uma função na thread do Tk
+        self.lock = threading.Lock()
+        self.running = False
+
+    def start(self, seconds, mode="amostragem"):
+        """Inicia uma coleta de `seconds` segundos; False se já houver uma em andamento"""
+        with self.lock:
+            if self.running:
+                print("Profiler: coleta já em andamento")
+                return False
+            self.running = True
+        print(f"Profiler: coletando por {seconds} s (modo {mode})")
+        if mode == "cprofile":
+            self.start_cprofile(seconds)
+        else:
+            threading.Thread(target=self.sample, args=(seconds,), daemon=True,
+                             name="profiler").start()
+        return True
+
+    def finish(self, summary):
+        """Publica o resumo e libera o profiler para uma nova coleta"""
+        try:
+            self.publish(summary)
+        except Exception as e:
+            print(f"Erro ao publicar perfil: {e}")
+        finally:
+            with self.lock:
+                self.running = False
+
+    def output_path(self, suffix):
+        self.folder.mkdir(exist_ok=True)
+        return self.folder / f"perfil-{datetime.now().strftime('%Y%m%d-%H%M%S')}{suffix}"
+
+    def prune(self):
+        """Mantém apenas os `keep` perfis mais recentes"""
+        files = sorted(self.folder.glob("perfil-*"), key=lambda p: p.stat().st_mtime)
+        for path in files[:-self.keep] if self.keep else files:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    # Modo amostragem -------------------------------------------------------
+
+    def sample(self, seconds):
+        """Laço da thread de amostragem (todas as threads, exceto ela mesma)"""
+        own_id = threading.get_ident()
+        stacks = Counter()
+        inclusive = Counter()  # (thread, função) -> amostras em que a função estava na pilha
+        leaf = Counter()
+        code_info = {}  # code object -> (rótulo, entra no resumo?), calculado uma vez por função
+        samples = 0
+        thread_samples = Counter()  # thread -> pilhas lidas dela
+        deadline = time.monotonic() + seconds
+        try:
+            while time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id:
+                        continue
+                    labels = []
+                    app_labels = set()
+                    while frame is not None:
+                        code = frame.f_code
+                        info = code_info.get(code)
+                        if info is None:
+                            info = code_info[code] = (
+                                frame_label(code),
+                                is_app_file(code.co_filename) and code.co_name not in ANCESTOR_FUNCTIONS,
+                            )
+                        label, is_app = info
+                        labels.append(label)
+                        if is_app:
+                            app_labels.add(label)
+                        frame = frame.f_back
+                    if not labels:
+                        continue
+                    thread_name = names.get(thread_id, str(thread_id))
+                    thread_samples[thread_name] += 1
+                    leaf[labels[0]] += 1
+                    inclusive.update((thread_name, label) for label in app_labels)
+                    labels.append(thread_name)
+                    stacks[";".join(reversed(labels))] += 1
+                samples += 1
+                time.sleep(SAMPLE_INTERVAL)
+
+            path = self.output_path(".collapsed.gz")
+            with gzip.open(path, "wt", encoding="utf-8") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            self.prune()
+            summary = {
+                "tipo": "perfil",
+                "modo": "amostragem",
+                "segundos": seconds,
+                "amostras": samples,
+                "arquivo": str(path),
+                # pct relativo às amostras da própria thread: 100% = thread sempre nessa função
+                "funcoes_app": sorted(
+                    (
+                        {"thread": thread_name, "funcao": label,
+                         "pct": round(100.0 * count / thread_samples[thread_name], 1)}
+                        for (thread_name, label), count in inclusive.items()
+                    ),
+                    key=lambda row: row["pct"],
+                    reverse=True,
+                )[:TOP_FUNCTIONS],
+                "topo_pilha": [
+                    {"funcao": label, "amostras": count}
+                    for label, count in leaf.most_common(TOP_FUNCTIONS)
+                ],
+            }
+        except Exception as e:
+            summary = {"tipo": "perfil", "erro": str(e)}
+        self.finish(summary)
+
+    # Modo cProfile ----------------------------------------------------------
+
+    def start_cprofile(self, seconds):
+        """Liga o cProfile na thread do Tk e agenda o desligamento"""
+        profile = cProfile.Profile()
+
+        def stop():
+            profile.disable()
+            # Processar fora da thread do Tk para não travar a tela
+            threading.Thread(target=self.write_cprofile, args=(profile, seconds),
+                             daemon=True, name="profiler").start()
+
+        def start():
+            profile.enable()
+            timer = threading.Timer(seconds, lambda: self.run_on_main(stop))
+            timer.daemon = True  # não segurar o encerramento (ex.: saída 75 da guarda)
+            timer.start()
+
+        self.run_on_main(start)
+
+    def write_cprofile(self, profile, seconds):
+        try:
+            path = self.output_path(".pstats.gz")
+            tmp_path = path.with_suffix(".tmp")
+            profile.dump_stats(str(tmp_path))
+            with open(tmp_path, "rb") as src, gzip.open(path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            tmp_path.unlink()
+            self.prune()
+
+            stats = pstats.Stats(profile).stats
+            rows = [
+                (cumulative, calls, key)
+                for key, (_, calls, _, cumulative, _) in stats.items()
+                if is_app_file(key[0])
+            ]
+            rows.sort(reverse=True)
+            summary = {
+                "tipo": "perfil",
+                "modo": "cprofile",
+                "segundos": seconds,
+                "arquivo": str(path),
+                "funcoes_app": [
+                    {
+                        "funcao": f"{func} ({os.path.basename(filename)}:{line})",
+                        "chamadas": calls,
+                        "tempo_acumulado_ms": round(cumulative * 1000, 1),
+                    }
+                    for cumulative, calls, (filename, line, func) in rows[:TOP_FUNCTIONS]
+                ],
+            }
+        except Exception as e:
+            summary = {"tipo": "perfil", "erro": str(e)}
+        self.finish(summary)
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Guarda de recursos para operação 24/7
+Mede periodicamente memória (RSS e, opcionalmente, tracemalloc), itens do
+canvas, imagens e callbacks after() do Tk, descritores de arquivo e
+processos filhos; compara com a primeira leitura (baseline) e decide se
+é preciso reiniciar o renderizador ou encerrar para o supervisor reiniciar.
+"""
+
+import os
+import threading
+import time
+import tracemalloc
+
+TOP_ALLOCATIONS = 5
+
+# Saída usada para pedir reinício ao supervisor (systemd Restart=on-failure, etc.)
+EXIT_CODE = 75  # EX_TEMPFAIL
+
+
+def read_rss_mb():
+    """Memória residente do processo em MB (None se indisponível)"""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # pico, em KB no Linux
+    except (ImportError, OSError):
+        return None
+
+
+def count_fds():
+    """Descritores de arquivo abertos (None se indisponível)"""
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return None
+
+
+def count_children():
+    """Processos filhos diretos (None se indisponível)"""
+    pid = os.getpid()
+    try:
+        total = 0
+        for task in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{task}/children') as f:
+                total += len(f.read().split())
+        return total
+    except OSError:
+        pass
+    # Kernel sem /proc/<pid>/task/<tid>/children: varrer o ppid de cada processo
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return None
+    total = 0
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            if int(fields[1]) == pid:
+                total += 1
+        except (OSError, ValueError, IndexError):
+            continue
+    return total
+
+
+class ResourceGuard:
+    """Compara leituras periódicas com a baseline e aciona reset/saída"""
+
+    def __init__(self, publish, on_reset, on_exit, run_on_main):
+        self.publish = publish
+        self.on_reset = on_reset
+        self.on_exit = on_exit
+        self.run_on_main = run_on_main  # agenda uma função na thread do Tk
+        self.baseline = None
+        self.reset_done = False  # já houve um reset desde o último alerta?
+        self.lock = threading.Lock()
+
+    def read(self, tk_stats, config):
+        """Leitura completa (chamada fora da thread do Tk)"""
+        reading = dict(tk_stats)
+        reading["rss_mb"] = read_rss_mb()
+        reading["fds"] = count_fds()
+        reading["filhos"] = count_children()
+        reading["threads"] = threading.active_count()
+        reading["instante"] = time.time()
+
+        if config.guard_tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start(1)
+        elif not config.guard_tracemalloc and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        if tracemalloc.is_tracing():
+            current, _ = tracemalloc.get_traced_memory()
+            reading["tracemalloc_mb"] = current / (1024 * 1024)
+        return reading
+
+    def top_allocations(self):
+        """Maiores alocações rastreadas (arquivo:linha) em KB"""
+        if not tracemalloc.is_tracing():
+            return []
+        snapshot = tracemalloc.take_snapshot()
+        return [
+            {"local": str(stat.traceback), "kb": round(stat.size / 1024, 1), "blocos": stat.count}
+            for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]
+        ]
+
+    def breaches(self, reading, growth, config):
+        """Lista de limites ultrapassados"""
+        checks = [
+            ("rss_mb", growth.get("rss_mb"), config.guard_rss_growth_mb),
+            ("fds", growth.get("fds"), config.guard_fd_growth),
+            ("canvas_itens", reading.get("canvas_itens"), config.guard_max_canvas_items),
+            ("imagens", reading.get("imagens"), config.guard_max_images),
+            ("after_pendentes", reading.get("after_pendentes"), config.guard_max_after_ids),
+            ("filhos", reading.get("filhos"), config.guard_max_children),
+        ]
+        return [name for name, value, limit in checks if value is not None and value > limit]
+
+    def evaluate(self, tk_stats, config, busy=False):
+        """Executado em thread: lê, compara com a baseline, reporta e decide a ação
+
+        Com `busy` (alarme tocando ou mensagem na tela), reset e saída ficam
+        para a próxima leitura.
+        """
+        with self.lock:
+            try:
+                reading = self.read(tk_stats, config)
+            except Exception as e:
+                print(f"Erro na leitura de recursos: {e}")
+                return
+            if self.baseline is None:
+                self.baseline = reading
+            growth = {
+                key: round(value - self.baseline[key], 1)
+                for key, value in reading.items()
+                if key != "instante" and value is not None and self.baseline.get(key) is not None
+            }
+            alerts = self.breaches(reading, growth, config)
+            report = {
+                "tipo": "recursos",
+                "leitura": {k: round(v, 1) if isinstance(v, float) else v for k, v in reading.items()},
+                "crescimento": growth,
+                "alertas": alerts,
+                "adiado": bool(alerts) and busy,
+                "top_alocacoes": self.top_allocations() if alerts or config.guard_tracemalloc else [],
+            }
+            try:
+                self.publish(report)
+            except Exception as e:
+                print(f"Erro ao publicar relatório de recursos: {e}")
+
+            if not alerts:
+                self.reset_done = False
+                return
+            print(f"Guarda de recursos: limites ultrapassados: {', '.join(alerts)}")
+            if busy:
+                print("Guarda de recursos: ação adiada (alarme ou mensagem em andamento)")
+                return
+            if not self.reset_done:
+                # Primeira tentativa: reset do renderizador dentro do processo
+                self.reset_done = True
+                self.run_on_main(self.on_reset)
+            elif config.guard_action == "exit":
+                # O reset não resolveu: sair de forma limpa para o supervisor reiniciar
+                self.run_on_main(self.on_exit)
@@ -7,14 +7,20 @@ Com alarmes sonoros e integração MQTT
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
+import argparse
+import bisect
 import sqlite3
 import os
+import gc
+import json
 import random
 import threading
 import time
 import subprocess
-from datetime import datetime
+import signal
+import sys
+from datetime import datetime, timedelta
 from pathlib import Path
 try:
     import paho.mqtt.client as mqtt
@@ -30,27 +36,37 @@ except ImportError:
     KEYBOARD_LISTENER_AVAILABLE = False
     print("Aviso: pynput não instalado. Instale com: pip install pynput")
 
+import audio_pipeline
+AUDIO_PIPELINE_AVAILABLE = audio_pipeline.PIPELINE_AVAILABLE and audio_pipeline.ALSA_AVAILABLE
+if not AUDIO_PIPELINE_AVAILABLE:
+    print("Aviso: numpy/miniaudio/pyalsaaudio não instalados. Alarmes usarão o mpg123.")
+
+from tts_announcer import TTSAnnouncer
+import settings
+import horarios_io
+import power_schedule
+from profiler import RemoteProfiler
+import resource_guard
+
 # Configurações
 DB_NAME = "config.db"
-MP3_FOLDER = "mp3"
 LOGO_FILE = "ifpb.png"
-MQTT_BROKER = "200.129.71.149"  # Ajuste conforme necessário
-MQTT_PORT = 1883
-MQTT_TOPIC = "ifpb/sala01/mensagens"
-MQTT_USERNAME = "iot"
-MQTT_PASSWORD = "123"
-ALARM_DURATION = 30  # segundos
+# Demais configurações (MQTT, alarme, mp3, animação, TTS): ver settings.py / settings.json
 
 class ScreensaverIFPB:
     def __init__(self):
+        # Configuração carregada uma vez; recarregada a quente via arquivo ou MQTT
+        self.settings_manager = settings.SettingsManager()
+        self.settings = self.settings_manager.current
+        
         self.root = None
         self.canvas = None
         self.logo_image = None
         self.logo_ids = []  # Lista de IDs dos elementos do logo
         self.logo_x = 0
         self.logo_y = 0
-        self.logo_dx = 2  # velocidade horizontal
-        self.logo_dy = 2  # velocidade vertical
+        self.logo_dx = self.settings.animation_speed  # velocidade horizontal
+        self.logo_dy = self.settings.animation_speed  # velocidade vertical
         self.logo_width = 200
         self.logo_height = 200
         
@@ -60,19 +76,40 @@ class ScreensaverIFPB:
         self.last_alarm_minute = None
         self.mqtt_client = None
         self.mqtt_connected = False
+        self.mqtt_retiring_client = None  # Cliente substituído, ativo até o novo se inscrever
+        self.mqtt_subscribe_mid = None  # mid da inscrição do cliente atual (aguardando SUBACK)
         self.message_display_id = None
         self.message_text_id = None
         self.logo_visible = True  # Controla se o logo está visível
         self.animation_paused = False  # Controla se a animação está pausada
-        self.mpg123_process = None  # Processo do mpg123 em execução
+        self.mpg123_process = None  # Processo do mpg123 em execução (fallback)
+        self.audio_pipeline = None  # Pipeline de áudio em processo
+        self.tts = None  # Anúncios falados das mensagens MQTT
+        self.mp3_files = []  # Biblioteca de músicas (escaneada no início e a cada alarme)
         self.keyboard_listener = None  # Listener de teclado do pynput
+        self.force_focus = False  # Fallback sem pynput: forçar o foco periodicamente
+        self.timers = {}  # after() periódicos por nome (permite suspender no modo ocioso)
+        self.idle = False  # Modo de economia de energia ativo
+        self.awake_until = None  # Mantém acordado após mensagem fora do horário
+        self.display_off = False  # Monitor desligado via DPMS pelo modo ocioso
+        self.dpms_was_enabled = None  # Estado do DPMS antes de desligar (para restaurar)
+        self.profiler = None  # Profiler sob demanda (criado no primeiro uso)
+        self.resource_guard = None  # Guarda de recursos para operação 24/7
+        self.exit_code = 0
         
         # Criar estrutura de pastas
         self.setup_folders()
+        self.scan_media_library()
         
         # Inicializar banco de dados
         self.init_database()
         
+        # Inicializar pipeline de áudio (fallback: mpg123)
+        self.init_audio()
+        
+        # Inicializar anúncios falados
+        self.init_tts()
+        
         # Inicializar interface principal (deve ser antes de carregar logo)
         self.init_main_window()
         
@@ -85,9 +122,9 @@ class ScreensaverIFPB:
         # Iniciar verificação de alarmes
         self.check_alarms()
         
-        # Iniciar cliente MQTT
-        if MQTT_AVAILABLE:
-            self.init_mqtt()
+        # Recarga a quente da configuração (arquivo settings.json)
+        self.settings_manager.add_listener(self.on_settings_changed)
+        self.settings_manager.start_watcher()
         
         # Handler genérico para capturar qualquer tecla (mais robusto para Armbian)
         def on_any_key(event):
@@ -151,13 +188,46 @@ class ScreensaverIFPB:
         self.root.after(200, self.ensure_fullscreen)
         
         # 8. Manter sempre no topo (menos agressivo)
-        self.root.after(1000, self.keep_focus)
+        self.schedule_timer('focus', 1000, self.keep_focus)
         
         # 9. Mostrar instruções brevemente
         self.root.after(500, self.show_instructions)
         
         # Iniciar animação
         self.animate_logo()
+        
+        # Economia de energia fora do horário de aulas
+        self.update_power_state()
+        
+        # Iniciar cliente MQTT (depois do modo ocioso: já nasce com o keepalive certo)
+        if MQTT_AVAILABLE:
+            self.init_mqtt()
+        
+        # Guarda de recursos (primeira leitura vira a baseline)
+        self.resource_guard = resource_guard.ResourceGuard(
+            publish=self.publish_status,
+            on_reset=lambda: self.guard_action(self.reset_renderer),
+            on_exit=lambda: self.guard_action(lambda: self.shutdown(resource_guard.EXIT_CODE)),
+            run_on_main=lambda callback: self.root.after(0, callback)
+        )
+        if self.settings.guard_enabled:
+            self.schedule_timer('guard', 60000, self.guard_check)
+        
+        # Profiler sob demanda: kill -USR1 <pid> (ou comando MQTT "perfil")
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.root.after(0, self.start_profile))
+    
+    def schedule_timer(self, name, delay, callback):
+        """Agenda um timer periódico nomeado (substitui o anterior de mesmo nome)"""
+        self.cancel_timers(name)
+        self.timers[name] = self.root.after(delay, callback)
+    
+    def cancel_timers(self, *names):
+        """Cancela timers nomeados pendentes"""
+        for name in names:
+            after_id = self.timers.pop(name, None)
+            if after_id:
+                self.root.after_cancel(after_id)
     
     def show_instructions(self):
         """Mostra instruções de uso na tela por alguns segundos"""
@@ -189,7 +259,7 @@ class ScreensaverIFPB:
                 except:
                     pass
                 # Verificar menos frequentemente (a cada 3 segundos)
-                self.root.after(3000, self.keep_focus)
+                self.schedule_timer('focus', 3000, self.keep_focus)
         except Exception as e:
             print(f"Erro em keep_focus: {e}")
     
@@ -262,33 +332,103 @@ class ScreensaverIFPB:
         self.canvas.bind('<Double-Button-1>', on_double_click)
         
         # Também tentar capturar eventos de teclado de forma mais agressiva
-        def force_key_capture():
-            """Tenta forçar captura de teclado periodicamente"""
-            try:
-                self.root.focus_force()
-                self.canvas.focus_force()
-            except:
-                pass
-            self.root.after(500, force_key_capture)
-        
-        force_key_capture()
+        self.force_focus = True
+        self.force_key_capture()
+    
+    def force_key_capture(self):
+        """Tenta forçar captura de teclado periodicamente (suspenso no modo ocioso)"""
+        try:
+            self.root.focus_force()
+            self.canvas.focus_force()
+        except:
+            pass
+        self.schedule_timer('focus_capture', 500, self.force_key_capture)
     
     def setup_folders(self):
         """Cria as pastas necessárias se não existirem"""
-        Path(MP3_FOLDER).mkdir(exist_ok=True)
+        Path(self.settings.mp3_folder).mkdir(exist_ok=True)
+    
+    def scan_media_library(self):
+        """Lista os MP3 disponíveis na pasta configurada"""
+        self.mp3_files = sorted(Path(self.settings.mp3_folder).glob("*.mp3"))
+        print(f"{len(self.mp3_files)} arquivo(s) MP3 em {self.settings.mp3_folder}/")
+    
+    def on_settings_changed(self, old, new, changed):
+        """Chamado pela thread do watcher/MQTT: aplica a mudança na thread do Tk"""
+        self.root.after(0, lambda: self.apply_settings(new, changed))
+    
+    def apply_settings(self, new, changed):
+        """Reinicia apenas os subsistemas afetados (não interrompe alarme em andamento)"""
+        self.settings = new
+        if changed & settings.MEDIA_FIELDS:
+            self.setup_folders()
+            self.scan_media_library()
+        if changed & settings.ANIMATION_FIELDS:
+            # Manter a direção atual, mudando apenas a velocidade
+            self.logo_dx = new.animation_speed if self.logo_dx >= 0 else -new.animation_speed
+            self.logo_dy = new.animation_speed if self.logo_dy >= 0 else -new.animation_speed
+        if changed & settings.TTS_FIELDS:
+            if self.tts:
+                self.tts.shutdown()
+                self.tts = None
+            self.init_tts()
+        if changed & settings.MQTT_FIELDS and MQTT_AVAILABLE:
+            self.reconnect_mqtt()
+        if changed & settings.POWER_FIELDS:
+            self.update_power_state()
+        if changed & settings.GUARD_FIELDS:
+            self.cancel_timers('guard')
+            if new.guard_enabled:
+                self.schedule_timer('guard', new.guard_interval * 1000, self.guard_check)
     
     def init_database(self):
         """Inicializa o banco de dados SQLite"""
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS horarios (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                hora TEXT NOT NULL
+        horarios_io.init_database(DB_NAME)
+    
+    def init_audio(self):
+        """Inicializa o pipeline de áudio em processo, se disponível"""
+        if not AUDIO_PIPELINE_AVAILABLE:
+            return
+        try:
+            self.audio_pipeline = audio_pipeline.AudioPipeline()
+        except Exception as e:
+            print(f"Erro ao iniciar pipeline de áudio, usando mpg123: {e}")
+            self.audio_pipeline = None
+    
+    def init_tts(self):
+        """Inicializa os anúncios falados (opcional)"""
+        if not self.settings.tts_enabled:
+            return
+        try:
+            self.tts = TTSAnnouncer(
+                self.play_announcement,
+                voice=self.settings.tts_voice,
+                cache_folder=self.settings.tts_cache_folder,
+                cache_max_bytes=self.settings.tts_cache_max_mb * 1024 * 1024,
+                workers=self.settings.tts_workers
             )
-        """)
-        conn.commit()
-        conn.close()
+        except Exception as e:
+            print(f"Erro ao iniciar anúncios falados, desativados: {e}")
+            self.tts = None
+            return
+        if not self.tts.available():
+            print("Aviso: espeak-ng não encontrado. Instale com: sudo apt-get install espeak-ng")
+            self.tts.shutdown()
+            self.tts = None
+    
+    def play_announcement(self, path):
+        """Reproduz um anúncio sintetizado (chamado pelo pool de TTS)"""
+        if self.audio_pipeline:
+            self.audio_pipeline.say(path)
+            return
+        try:
+            subprocess.Popen(
+                ['aplay', '-q', str(path)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+        except FileNotFoundError:
+            print("Erro: aplay não encontrado. Instale com: sudo apt-get install alsa-utils")
     
     def load_logo(self):
         """Carrega o logo do IFPB ou cria um placeholder"""
@@ -400,7 +540,7 @@ class ScreensaverIFPB:
         """Anima o logo pela tela (usando after() para eficiência)"""
         # Não animar se o logo estiver oculto
         if not self.logo_visible:
-            self.root.after(30, self.animate_logo)
+            self.schedule_timer('animate', self.settings.animation_interval, self.animate_logo)
             return
         
         screen_width = self.root.winfo_screenwidth()
@@ -423,7 +563,7 @@ class ScreensaverIFPB:
         self.draw_logo()
         
         # Agendar próxima animação (30ms = ~33 FPS, leve para Armbian)
-        self.root.after(30, self.animate_logo)
+        self.schedule_timer('animate', self.settings.animation_interval, self.animate_logo)
     
     def hide_logo(self):
         """Oculta o logo da tela"""
@@ -458,20 +598,102 @@ class ScreensaverIFPB:
         
         # Evitar disparar duas vezes no mesmo minuto
         if current_minute == self.last_alarm_minute:
-            self.root.after(60000, self.check_alarms)  # Verificar novamente em 1 minuto
+            self.schedule_timer('alarms', 60000, self.check_alarms)  # Verificar novamente em 1 minuto
             return
         
         horarios = self.get_horarios()
         
         if current_time in horarios:
             self.last_alarm_minute = current_minute
+            # Alarme fora da janela (ex.: fim de semana): acender a tela antes de tocar
+            if self.idle:
+                self.wake_up()
             self.play_random_mp3()
         
         # Agendar próxima verificação em 1 minuto
-        self.root.after(60000, self.check_alarms)
+        self.schedule_timer('alarms', 60000, self.check_alarms)
+    
+    def alarm_playing(self):
+        """Indica se há um alarme tocando"""
+        if self.audio_pipeline and self.audio_pipeline.is_playing():
+            return True
+        return self.mpg123_process is not None and self.mpg123_process.poll() is None
+    
+    def update_power_state(self):
+        """Entra/sai do modo ocioso conforme a grade de horários e agenda a próxima verificação"""
+        self.cancel_timers('power')
+        config = self.settings
+        now = datetime.now()
+        horarios = self.get_horarios()
+        days = power_schedule.parse_days(config.power_save_days)
+        
+        active = (
+            not config.power_save_enabled
+            or power_schedule.in_active_window(now, horarios, config.power_save_margin, days)
+            or (self.awake_until is not None and now < self.awake_until)
+            or self.message_text_id is not None
+            or self.alarm_playing()
+        )
+        
+        if active:
+            self.exit_idle()
+            delay = 60
+        else:
+            wake = power_schedule.next_wake(now, horarios, config.power_save_margin, days)
+            self.enter_idle(wake)
+            # Acordar na próxima janela; reavaliar ao menos a cada 10 min (ajustes de relógio,
+            # grade importada por outro processo com --importar)
+            delay = 600 if wake is None else min(600, max(60, (wake - now).total_seconds()))
+        self.schedule_timer('power', int(delay * 1000), self.update_power_state)
+    
+    def enter_idle(self, wake=None):
+        """Suspende animação e foco; apaga a tela e reduz o keepalive MQTT"""
+        if self.idle:
+            return
+        self.idle = True
+        print(f"Economia de energia: tela apagada até {power_schedule.format_wake(wake)}")
+        # A checagem de alarmes continua (uma consulta por minuto): os horários não têm
+        # dia da semana, então um alarme fora da janela ainda precisa tocar
+        self.cancel_timers('animate', 'focus', 'focus_capture')
+        self.hide_logo()
+        if self.settings.power_save_dpms:
+            self.dpms_was_enabled = power_schedule.dpms_enabled()
+            self.display_off = power_schedule.set_display_power(False)
+        if MQTT_AVAILABLE and self.mqtt_client:
+            self.reconnect_mqtt()
+    
+    def exit_idle(self):
+        """Restaura a tela e os timers normais"""
+        if not self.idle:
+            return
+        self.idle = False
+        print("Economia de energia: retomando operação normal")
+        if self.display_off:
+            power_schedule.set_display_power(True, self.dpms_was_enabled)
+            self.display_off = False
+        if not self.message_text_id:
+            self.show_logo()
+        self.animate_logo()
+        self.keep_focus()
+        if self.force_focus:
+            self.force_key_capture()
+        self.check_alarms()
+        if MQTT_AVAILABLE and self.mqtt_client:
+            self.reconnect_mqtt()
+    
+    def wake_up(self):
+        """Acorda por alguns minutos (ex.: mensagem MQTT fora do horário)"""
+        self.awake_until = datetime.now() + timedelta(minutes=self.settings.power_save_linger)
+        self.update_power_state()
     
     def stop_mp3(self):
         """Para a reprodução do MP3"""
+        if self.audio_pipeline:
+            self.audio_pipeline.stop()
+        self.stop_mpg123()
+    
+    def stop_mpg123(self):
+        """Para o processo mpg123 (reprodução sem o pipeline de áudio)"""
         if self.mpg123_process:
             try:
                 self.mpg123_process.terminate()
@@ -485,7 +707,11 @@ class ScreensaverIFPB:
     
     def play_random_mp3(self):
         """Toca um arquivo MP3 aleatório por 30 segundos e exibe mensagem de mudança de aula"""
-        mp3_files = list(Path(MP3_FOLDER).glob("*.mp3"))
+        # Varrer a pasta a cada alarme (no máximo uma vez por minuto): arquivos
+        # copiados ou removidos depois do início entram/saem da seleção
+        self.scan_media_library()
+        mp3_files = self.mp3_files
+        duration = self.settings.alarm_duration
         
         # Exibir mensagem de mudança de aula na tela
         now = datetime.now()
@@ -498,12 +724,23 @@ class ScreensaverIFPB:
             print("Nenhum arquivo MP3 encontrado na pasta mp3/")
             return
         
-        # Parar qualquer reprodução anterior
-        self.stop_mp3()
+        # Parar o mpg123 anterior. O pipeline não é parado aqui: play() já encerra a
+        # música anterior e mantém a fila de anúncios falados, que continuam sobre a
+        # música reduzida em vez de serem cortados pelo alarme.
+        self.stop_mpg123()
         
         # Escolher arquivo aleatório
         selected_file = random.choice(mp3_files)
         
+        if self.audio_pipeline:
+            try:
+                # Chime + música com fade-in/fade-out; termina sozinho após a duração
+                self.audio_pipeline.play(selected_file, duration)
+                print(f"Tocando: {selected_file.name} por {duration} segundos")
+                return
+            except Exception as e:
+                print(f"Erro no pipeline de áudio, usando mpg123: {e}")
+        
         try:
             # Tocar usando mpg123
             # -q = quiet mode (sem output)
@@ -514,9 +751,9 @@ class ScreensaverIFPB:
             )
             
             # Parar após 30 segundos
-            self.root.after(ALARM_DURATION * 1000, self.stop_mp3)
+            self.schedule_timer('mp3_stop', duration * 1000, self.stop_mp3)
             
-            print(f"Tocando: {selected_file.name} por {ALARM_DURATION} segundos")
+            print(f"Tocando: {selected_file.name} por {duration} segundos")
         except FileNotFoundError:
             print("Erro: mpg123 não encontrado. Instale com: sudo apt-get install mpg123")
         except Exception as e:
@@ -530,7 +767,7 @@ class ScreensaverIFPB:
         
         self.config_window = tk.Toplevel(self.root)
         self.config_window.title("Configuração de Horários")
-        self.config_window.geometry("400x500")
+        self.config_window.geometry("400x600")
         self.config_window.attributes('-topmost', True)
         self.config_window.configure(bg='#f0f0f0')
         
@@ -561,10 +798,12 @@ class ScreensaverIFPB:
         def add_horario():
             hora = hora_entry.get().strip()
             if self.validate_hora(hora):
+                hora = horarios_io.normalize_hora(hora)  # "7:00" -> "07:00", como na importação
                 if self.insert_horario(hora):
                     hora_entry.delete(0, tk.END)
                     hora_entry.focus_set()  # Volta o foco para o campo
-                    refresh_list()
+                    self.listbox_insert_sorted([hora])
+                    self.update_power_state()  # a janela de aulas pode ter mudado
                     # Mostrar feedback visual de sucesso
                     status_label.config(text=f"✓ Horário {hora} adicionado!", foreground="green")
                     # Limpar mensagem após 2 segundos
@@ -607,7 +846,8 @@ class ScreensaverIFPB:
             if selection:
                 hora = self.horarios_listbox.get(selection[0])
                 if self.delete_horario(hora):
-                    refresh_list()
+                    self.horarios_listbox.delete(selection[0])
+                    self.update_power_state()
                     # Mostrar feedback visual de sucesso
                     delete_status_label.config(text=f"✓ Horário {hora} removido!", foreground="red")
                     # Limpar mensagem após 2 segundos
@@ -637,6 +877,53 @@ class ScreensaverIFPB:
         
         ttk.Button(delete_frame, text="Fechar", command=close_config).pack(side=tk.RIGHT, padx=5)
         
+        # Frame para importação/exportação em lote
+        bulk_frame = ttk.LabelFrame(main_frame, text="Importar / Exportar (CSV ou JSON)", padding="10")
+        bulk_frame.pack(fill=tk.X, pady=5)
+        
+        bulk_status_label = ttk.Label(bulk_frame, text="", foreground="green", font=('Arial', 9))
+        
+        def import_horarios():
+            path = filedialog.askopenfilename(
+                parent=self.config_window,
+                title="Importar horários",
+                filetypes=[("CSV ou JSON", "*.csv *.json"), ("Todos os arquivos", "*")]
+            )
+            if not path:
+                return
+            try:
+                new, existing = horarios_io.import_file(DB_NAME, path)
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Erro", f"Nada foi importado.\n\n{e}", parent=self.config_window)
+                return
+            self.listbox_insert_sorted(new)
+            self.update_power_state()
+            bulk_status_label.config(
+                text=f"✓ {len(new)} importado(s), {existing} já cadastrado(s)", foreground="green"
+            )
+            self.config_window.after(3000, lambda: bulk_status_label.config(text=""))
+        
+        def export_horarios():
+            path = filedialog.asksaveasfilename(
+                parent=self.config_window,
+                title="Exportar horários",
+                defaultextension=".csv",
+                filetypes=[("CSV", "*.csv"), ("JSON", "*.json")]
+            )
+            if not path:
+                return
+            try:
+                count = horarios_io.export_file(DB_NAME, path)
+            except OSError as e:
+                messagebox.showerror("Erro", f"Erro ao exportar: {e}", parent=self.config_window)
+                return
+            bulk_status_label.config(text=f"✓ {count} horário(s) exportado(s)", foreground="green")
+            self.config_window.after(3000, lambda: bulk_status_label.config(text=""))
+        
+        ttk.Button(bulk_frame, text="Importar...", command=import_horarios).pack(side=tk.LEFT, padx=5)
+        ttk.Button(bulk_frame, text="Exportar...", command=export_horarios).pack(side=tk.LEFT, padx=5)
+        bulk_status_label.pack(side=tk.LEFT, padx=5)
+        
         def refresh_list():
             """Atualiza a lista de horários"""
             self.horarios_listbox.delete(0, tk.END)
@@ -646,16 +933,17 @@ class ScreensaverIFPB:
         
         refresh_list()
     
+    def listbox_insert_sorted(self, horas):
+        """Insere horários na lista mantendo a ordem, sem recarregar tudo do banco"""
+        items = list(self.horarios_listbox.get(0, tk.END))
+        for hora in horas:
+            index = bisect.bisect_left(items, hora)
+            items.insert(index, hora)
+            self.horarios_listbox.insert(index, hora)
+    
     def validate_hora(self, hora):
         """Valida formato HH:MM"""
-        try:
-            parts = hora.split(':')
-            if len(parts) != 2:
-                return False
-            h, m = int(parts[0]), int(parts[1])
-            return 0 <= h <= 23 and 0 <= m <= 59
-        except:
-            return False
+        return horarios_io.validate_hora(hora)
     
     def insert_horario(self, hora):
         """Insere horário no banco. Retorna True se inserido com sucesso, False caso contrário"""
@@ -690,44 +978,232 @@ class ScreensaverIFPB:
         if not MQTT_AVAILABLE:
             return
         
-        def mqtt_thread():
-            self.mqtt_client = mqtt.Client()
-            self.mqtt_client.on_connect = self.on_mqtt_connect
-            self.mqtt_client.on_message = self.on_mqtt_message
-            self.mqtt_client.on_disconnect = self.on_mqtt_disconnect
-            
-            # Configurar autenticação
-            self.mqtt_client.username_pw_set(MQTT_USERNAME, MQTT_PASSWORD)
-            
+        config = self.settings
+        # Keepalive maior no modo ocioso: menos tráfego e menos despertares da CPU
+        keepalive = config.mqtt_idle_keepalive if self.idle else config.mqtt_keepalive
+        
+        # Criado aqui para que reconexões seguidas vejam sempre o cliente atual
+        client = mqtt.Client()
+        client.on_connect = self.on_mqtt_connect
+        client.on_message = self.on_mqtt_message
+        client.on_subscribe = self.on_mqtt_subscribe
+        client.on_disconnect = self.on_mqtt_disconnect
+        
+        # Configurar autenticação
+        client.username_pw_set(config.mqtt_username, config.mqtt_password)
+        self.mqtt_client = client
+        
+        try:
+            # Conexão feita pela thread do paho, que tenta de novo se o broker
+            # ainda não estiver no ar (inclusive na primeira conexão)
+            client.connect_async(config.mqtt_broker, config.mqtt_port, keepalive)
+            client.loop_start()
+        except Exception as e:
+            print(f"Erro ao conectar MQTT: {e}")
+    
+    def reconnect_mqtt(self):
+        """Conecta um novo cliente com a configuração atual; o antigo continua
+        recebendo mensagens até o novo confirmar as inscrições (SUBACK)"""
+        # Reconexão seguida: o cliente que já estava saindo pode parar agora
+        self.stop_mqtt_client(self.mqtt_retiring_client)
+        self.mqtt_retiring_client = self.mqtt_client
+        self.mqtt_connected = False
+        self.mqtt_subscribe_mid = None
+        print("Reconectando MQTT")
+        self.init_mqtt()  # troca self.mqtt_client
+    
+    def stop_mqtt_client(self, client):
+        """Desconecta um cliente substituído sem bloquear a thread atual"""
+        if client is None:
+            return
+        
+        def stop():
             try:
-                self.mqtt_client.connect(MQTT_BROKER, MQTT_PORT, 60)
-                self.mqtt_client.loop_start()
+                client.disconnect()
+                client.loop_stop()
             except Exception as e:
-                print(f"Erro ao conectar MQTT: {e}")
-        
-        mqtt_thread_obj = threading.Thread(target=mqtt_thread, daemon=True)
-        mqtt_thread_obj.start()
+                print(f"Erro ao desconectar MQTT: {e}")
+        threading.Thread(target=stop, daemon=True).start()
+    
+    def on_mqtt_subscribe(self, client, userdata, mid, granted_qos):
+        """Inscrições do cliente atual confirmadas: o cliente antigo pode sair"""
+        if client is not self.mqtt_client or mid != self.mqtt_subscribe_mid:
+            return
+        old_client = self.mqtt_retiring_client
+        self.mqtt_retiring_client = None  # a partir daqui, mensagens do antigo seriam duplicadas
+        self.stop_mqtt_client(old_client)
     
     def on_mqtt_connect(self, client, userdata, flags, rc):
         """Callback de conexão MQTT"""
+        if client is not self.mqtt_client:
+            client.disconnect()  # cliente substituído que terminou de conectar tarde
+            return
         if rc == 0:
             self.mqtt_connected = True
-            client.subscribe(MQTT_TOPIC)
-            print(f"Conectado ao MQTT broker. Inscrito em: {MQTT_TOPIC}")
+            # Uma única inscrição: um SUBACK confirma os três tópicos
+            _, self.mqtt_subscribe_mid = client.subscribe([
+                (self.settings.mqtt_topic, 0),
+                (self.settings.mqtt_config_topic, 0),
+                (self.settings.mqtt_command_topic, 0),
+            ])
+            print(f"Conectado ao MQTT broker. Inscrito em: {self.settings.mqtt_topic}")
         else:
             print(f"Falha na conexão MQTT. Código: {rc}")
     
     def on_mqtt_message(self, client, userdata, msg):
         """Callback de mensagem MQTT recebida"""
+        if client is not self.mqtt_client and client is not self.mqtt_retiring_client:
+            return
         try:
             message = msg.payload.decode('utf-8')
+            # Comando de configuração (JSON), ex.: {"alarm_duration": 20} ou {"reload": true}
+            if msg.topic == self.settings.mqtt_config_topic:
+                print(f"Comando de configuração MQTT: {message}")
+                self.settings_manager.apply_override(message)
+                return
+            if msg.topic == self.settings.mqtt_command_topic:
+                print(f"Comando MQTT: {message}")
+                self.handle_command(message)
+                return
+            # Sonda de teste de carga: exibir na thread do Tk e ecoar no tópico de status
+            probe = self.parse_probe(message)
+            if probe:
+                self.root.after(0, lambda: self.display_probe(client, probe))
+                return
             print(f"Mensagem MQTT recebida: {message}")
+            # Fora do horário: acordar a tela para exibir a mensagem
+            if self.idle:
+                self.root.after(0, self.wake_up)
+            # Reduzir o volume do alarme enquanto o anúncio está na tela
+            if self.audio_pipeline:
+                self.audio_pipeline.duck(self.settings.announcement_duck)
+            # Anunciar em voz alta (síntese em segundo plano)
+            if self.tts:
+                self.tts.announce(message)
             self.display_message(message)
         except Exception as e:
             print(f"Erro ao processar mensagem MQTT: {e}")
     
+    def handle_command(self, message):
+        """Comandos remotos: {"comando": "perfil", "segundos": 30, "modo": "cprofile"} ou "perfil" """
+        try:
+            command = json.loads(message)
+        except ValueError:
+            command = {"comando": message.strip()}
+        if not isinstance(command, dict):
+            command = {"comando": str(command)}
+        name = command.get("comando")
+        if name == "perfil":
+            # Mesma thread do SIGUSR1 (Tk): o profiler é criado/alterado só ali
+            self.root.after(0, lambda: self.start_profile(command.get("segundos"),
+                                                          command.get("modo", "amostragem")))
+        elif name == "recursos":
+            self.root.after(0, self.guard_check)
+        else:
+            print(f"Aviso: comando MQTT desconhecido: {name}")
+    
+    def start_profile(self, seconds=None, mode="amostragem"):
+        """Inicia uma coleta do profiler (MQTT ou SIGUSR1)"""
+        config = self.settings
+        try:
+            seconds = int(seconds or config.profile_seconds)
+        except (TypeError, ValueError):
+            seconds = config.profile_seconds
+        seconds = max(1, min(seconds, config.profile_max_seconds))
+        if self.profiler is None:
+            self.profiler = RemoteProfiler(
+                config.profile_folder,
+                config.profile_keep,
+                publish=self.publish_profile,
+                run_on_main=lambda callback: self.root.after(0, callback)
+            )
+        self.profiler.folder = Path(config.profile_folder)
+        self.profiler.keep = config.profile_keep
+        self.profiler.start(seconds, mode)
+    
+    def publish_profile(self, summary):
+        """Mostra o resumo do perfil no log e publica no tópico de status"""
+        if "erro" in summary:
+            print(f"Profiler: erro na coleta: {summary['erro']}")
+        else:
+            print(f"Profiler: perfil salvo em {summary['arquivo']}")
+            for row in summary["funcoes_app"]:
+                print(f"  {row}")
+        self.publish_status(summary)
+    
+    def guard_check(self):
+        """Coleta os dados do Tk e avalia os recursos em outra thread"""
+        if not self.settings.guard_enabled:
+            return
+        tk_stats = {
+            "canvas_itens": len(self.canvas.find_all()),
+            "imagens": len(self.root.image_names()),
+            "after_pendentes": len(self.root.tk.splitlist(self.root.tk.call('after', 'info'))),
+        }
+        threading.Thread(
+            target=self.resource_guard.evaluate,
+            args=(tk_stats, self.settings, self.guard_busy()),
+            daemon=True
+        ).start()
+        self.schedule_timer('guard', self.settings.guard_interval * 1000, self.guard_check)
+    
+    def guard_busy(self):
+        """Indica se um reset/saída agora cortaria um alarme, anúncio ou mensagem"""
+        return self.alarm_playing() or self.message_text_id is not None
+    
+    def guard_action(self, action):
+        """Executa o reset/saída da guarda, esperando o fim de alarme ou mensagem"""
+        if self.guard_busy():
+            # Alarme ou mensagem começou depois da leitura: tentar de novo em instantes
+            self.schedule_timer('guard_retry', 5000, lambda: self.guard_action(action))
+            return
+        action()
+    
+    def reset_renderer(self):
+        """Reset controlado do renderizador: recria itens do canvas e a imagem do logo"""
+        print("Guarda de recursos: reiniciando o renderizador")
+        if self.message_display_id:
+            self.root.after_cancel(self.message_display_id)
+            self.message_display_id = None
+        self.canvas.delete('all')
+        self.logo_ids.clear()
+        self.message_text_id = None
+        self.logo_image = None
+        gc.collect()
+        self.load_logo()
+        self.logo_visible = not self.idle
+        if self.logo_visible:
+            self.draw_logo()
+            self.animate_logo()
+    
+    def publish_status(self, payload):
+        """Publica um relatório JSON no tópico de status (se conectado)"""
+        if MQTT_AVAILABLE and self.mqtt_client and self.mqtt_connected:
+            self.mqtt_client.publish(self.settings.mqtt_status_topic, json.dumps(payload))
+    
+    def parse_probe(self, message):
+        """Retorna a sonda do test_mqtt.py --carga ({"probe": ...}) ou None"""
+        if not message.startswith('{"probe"'):
+            return None
+        try:
+            probe = json.loads(message)
+        except ValueError:
+            return None
+        return probe if isinstance(probe, dict) else None
+    
+    def display_probe(self, client, probe):
+        """Exibe a sonda e publica o eco com o instante em que foi exibida"""
+        self.display_message(str(probe.get("texto", "")))
+        echo = {"probe": probe.get("probe"), "t": probe.get("t"), "exibido": time.time()}
+        try:
+            client.publish(self.settings.mqtt_status_topic, json.dumps(echo))
+        except Exception as e:
+            print(f"Erro ao publicar eco: {e}")
+    
     def on_mqtt_disconnect(self, client, userdata, rc):
         """Callback de desconexão MQTT"""
+        if client is not self.mqtt_client:
+            return  # desconexão do cliente antigo após uma reconexão
         self.mqtt_connected = False
         print("Desconectado do MQTT broker")
     
@@ -766,37 +1242,74 @@ class ScreensaverIFPB:
             self.message_text_id = None
         self.message_display_id = None
         
-        # Mostrar logo novamente quando mensagem desaparecer
-        self.show_logo()
+        # Mostrar logo novamente quando mensagem desaparecer (no modo ocioso a tela
+        # fica preta: um logo redesenhado ficaria parado a noite toda)
+        if not self.idle:
+            self.show_logo()
     
     def on_escape(self, event=None):
         """Fecha o programa ao pressionar Escape"""
         if messagebox.askyesno("Sair", "Deseja realmente sair?"):
-            # Parar listener de teclado
-            if self.keyboard_listener:
-                try:
-                    self.keyboard_listener.stop()
-                except:
-                    pass
-            
-            if self.mqtt_client:
-                self.mqtt_client.loop_stop()
-                self.mqtt_client.disconnect()
-            # Parar qualquer reprodução de MP3
-            self.stop_mp3()
-            self.root.quit()
+            self.shutdown()
+    
+    def shutdown(self, exit_code=0):
+        """Encerra o programa liberando listener, MQTT, áudio e threads"""
+        self.exit_code = exit_code
+        if exit_code:
+            print(f"Encerrando para reinício pelo supervisor (código {exit_code})")
+        # Parar listener de teclado
+        if self.keyboard_listener:
+            try:
+                self.keyboard_listener.stop()
+            except:
+                pass
+        
+        self.settings_manager.stop_watcher()
+        for client in (self.mqtt_client, self.mqtt_retiring_client):
+            if client:
+                client.disconnect()
+                client.loop_stop()
+        # Parar qualquer reprodução de MP3
+        self.stop_mp3()
+        if self.tts:
+            self.tts.shutdown()
+        # Religar o monitor e restaurar o DPMS se sair durante o modo ocioso
+        if self.display_off:
+            power_schedule.set_display_power(True, self.dpms_was_enabled)
+            self.display_off = False
+        self.root.quit()
     
     def run(self):
-        """Inicia o loop principal"""
+        """Inicia o loop principal; retorna o código de saída"""
         self.root.mainloop()
+        return self.exit_code
 
 
 def main():
     """Função principal"""
+    parser = argparse.ArgumentParser(description="Proteção de Tela Inteligente IFPB")
+    parser.add_argument("--importar", metavar="ARQUIVO", help="importa horários de CSV/JSON e sai")
+    parser.add_argument("--exportar", metavar="ARQUIVO", help="exporta horários para CSV/JSON e sai")
+    args = parser.parse_args()
+    
+    if args.importar or args.exportar:
+        horarios_io.init_database(DB_NAME)
+        try:
+            if args.importar:
+                new, existing = horarios_io.import_file(DB_NAME, args.importar)
+                print(f"✓ {len(new)} horário(s) importado(s), {existing} já cadastrado(s)")
+            if args.exportar:
+                count = horarios_io.export_file(DB_NAME, args.exportar)
+                print(f"✓ {count} horário(s) exportado(s) para {args.exportar}")
+        except (OSError, ValueError) as e:
+            print(f"Erro: {e}")
+            return 1
+        return 0
+    
     app = ScreensaverIFPB()
-    app.run()
+    return app.run()
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
 
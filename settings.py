@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Configuração da Proteção de Tela IFPB
+Combina valores padrão, arquivo JSON, variáveis de ambiente e comandos
+MQTT em um snapshot imutável, com recarga a quente.
+Precedência: padrão < arquivo < ambiente < MQTT.
+"""
+
+import json
+import os
+import threading
+from typing import NamedTuple
+
+SETTINGS_FILE = "settings.json"
+ENV_PREFIX = "IFPB_"  # ex.: IFPB_MQTT_BROKER=10.0.0.5
+WATCH_INTERVAL = 5  # segundos entre verificações do arquivo
+
+
+class Settings(NamedTuple):
+    """Snapshot imutável da configuração"""
+    mqtt_broker: str = "200.129.71.149"
+    mqtt_port: int = 1883
+    mqtt_topic: str = "ifpb/sala01/mensagens"
+    mqtt_config_topic: str = "ifpb/sala01/config"
+    mqtt_status_topic: str = "ifpb/sala01/status"  # ecos das sondas de carga e relatórios
+    mqtt_command_topic: str = "ifpb/sala01/comando"  # comandos remotos, ex.: {"comando": "perfil"}
+    mqtt_username: str = "iot"
+    mqtt_password: str = "123"
+    mqtt_keepalive: int = 60  # segundos
+    alarm_duration: int = 30  # segundos
+    announcement_duck: int = 5  # segundos de volume reduzido ao chegar mensagem MQTT
+    mp3_folder: str = "mp3"
+    animation_interval: int = 30  # ms entre quadros (~33 FPS)
+    animation_speed: int = 2  # pixels por quadro
+    tts_enabled: bool = False
+    tts_voice: str = "pt-br"
+    tts_cache_folder: str = "tts_cache"
+    tts_cache_max_mb: int = 50
+    tts_workers: int = 2
+    power_save_enabled: bool = True  # apagar a tela fora do horário de aulas
+    power_save_margin: int = 30  # minutos antes do primeiro / depois do último alarme
+    power_save_days: str = "0,1,2,3,4"  # dias letivos (0 = segunda ... 6 = domingo)
+    power_save_linger: int = 10  # minutos acordado após mensagem MQTT fora do horário
+    power_save_dpms: bool = True  # desligar o monitor via xset (senão, só tela preta)
+    mqtt_idle_keepalive: int = 600  # keepalive MQTT (s) durante a economia de energia
+    profile_folder: str = "profiles"
+    profile_seconds: int = 30  # duração padrão de uma coleta do profiler
+    profile_max_seconds: int = 300
+    profile_keep: int = 20  # perfis mantidos em disco
+    guard_enabled: bool = True  # guarda de recursos (memória, canvas, after, fds, filhos)
+    guard_interval: int = 300  # segundos entre leituras
+    guard_tracemalloc: bool = False  # rastrear alocações (tem custo; ativar para investigar)
+    guard_rss_growth_mb: int = 64  # crescimento máximo de RSS sobre a baseline
+    guard_fd_growth: int = 50  # crescimento máximo de descritores abertos
+    guard_max_canvas_items: int = 200
+    guard_max_images: int = 20
+    guard_max_after_ids: int = 100
+    guard_max_children: int = 5
+    guard_action: str = "report"  # "report" (apenas reporta) ou "exit" (só com supervisor que reinicie)
+
+
+# Valores mínimos aceitos para campos inteiros (demais: >= 0)
+MINIMUMS = {"mqtt_port": 1, "animation_interval": 10, "tts_workers": 1, "tts_cache_max_mb": 1,
+            "mqtt_keepalive": 5, "mqtt_idle_keepalive": 5,
+            "profile_seconds": 1, "profile_max_seconds": 1, "profile_keep": 1,
+            "guard_interval": 10}
+
+# Campos agrupados pelo subsistema que precisa reiniciar quando mudam
+MQTT_FIELDS = {"mqtt_broker", "mqtt_port", "mqtt_topic", "mqtt_config_topic",
+               "mqtt_status_topic", "mqtt_command_topic", "mqtt_username", "mqtt_password",
+               "mqtt_keepalive"}
+MEDIA_FIELDS = {"mp3_folder"}
+ANIMATION_FIELDS = {"animation_interval", "animation_speed"}
+TTS_FIELDS = {"tts_enabled", "tts_voice", "tts_cache_folder", "tts_cache_max_mb", "tts_workers"}
+GUARD_FIELDS = {"guard_enabled", "guard_interval"}
+# Únicos campos alteráveis por MQTT. Conexão, tópicos, caminhos e a ação da guarda
+# ficam só no arquivo/ambiente: um cliente do broker não pode levar a TV Box para
+# outro broker, deixar de ouvir o tópico de configuração ou apontar limpezas de
+# cache para outras pastas.
+MQTT_ALLOWED_FIELDS = {
+    "alarm_duration", "announcement_duck",
+    "animation_interval", "animation_speed",
+    "tts_enabled", "tts_voice", "tts_cache_max_mb", "tts_workers",
+    "power_save_enabled", "power_save_margin", "power_save_days", "power_save_linger",
+    "power_save_dpms", "mqtt_idle_keepalive",
+    "profile_seconds", "profile_max_seconds", "profile_keep",
+    "guard_interval", "guard_tracemalloc", "guard_rss_growth_mb", "guard_fd_growth",
+    "guard_max_canvas_items", "guard_max_images", "guard_max_after_ids", "guard_max_children",
+}
+POWER_FIELDS = {"power_save_enabled", "power_save_margin", "power_save_days", "power_save_linger",
+                "power_save_dpms", "mqtt_idle_keepalive"}
+
+
+def parse_value(name, value):
+    """Converte um valor bruto (JSON, ambiente ou MQTT) para o tipo do campo"""
+    kind = Settings.__annotations__[name]
+    if kind is bool:
+        if isinstance(value, str):
+            lowered = value.strip().lower()
+            if lowered in ("1", "true", "sim", "yes", "on"):
+                return True
+            if lowered in ("0", "false", "nao", "não", "no", "off"):
+                return False
+            raise ValueError(f"valor booleano inválido: {value!r}")
+        return bool(value)
+    if kind is int:
+        if isinstance(value, bool):
+            raise ValueError(f"valor inteiro inválido: {value!r}")
+        if isinstance(value, float):
+            # JSON aceita 1e999/Infinity/NaN; 3.7 não deve virar 3 silenciosamente
+            if not value.is_integer():
+                raise ValueError(f"valor inteiro inválido: {value!r}")
+            value = int(value)
+        parsed = int(value)
+        minimum = MINIMUMS.get(name, 0)
+        if parsed < minimum:
+            raise ValueError(f"valor abaixo do mínimo ({minimum}): {value!r}")
+        return parsed
+    if value is None:
+        raise ValueError("valor ausente (null)")
+    return str(value)
+
+
+class SettingsError(Exception):
+    """Arquivo de configuração ilegível ou com valor inválido (modo estrito)"""
+
+
+def parse_values(raw, origin, strict=False):
+    """Valida um dicionário de valores; campos inválidos são ignorados com aviso
+    (ou, com strict, levantam SettingsError)"""
+    values = {}
+    for name, value in raw.items():
+        if name not in Settings._fields:
+            print(f"Aviso: configuração desconhecida em {origin}: {name}")
+            continue
+        try:
+            values[name] = parse_value(name, value)
+        except (TypeError, ValueError, OverflowError) as e:
+            if strict:
+                raise SettingsError(f"configuração inválida em {origin} ({name}): {e}") from e
+            print(f"Aviso: configuração inválida em {origin} ({name}): {e}")
+    return values
+
+
+def read_file(path, strict=False):
+    """Lê o arquivo de configuração JSON (ausente = vazio).
+    Com strict, erros de leitura ou de valor levantam SettingsError em vez de
+    cair nos padrões: usado na recarga, para não trocar a configuração em uso
+    por um arquivo com erro de digitação ou salvo pela metade."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        if strict:
+            raise SettingsError(f"erro ao ler {path}: {e}") from e
+        print(f"Aviso: erro ao ler {path}: {e}")
+        return {}
+    if not isinstance(raw, dict):
+        if strict:
+            raise SettingsError(f"{path} deve conter um objeto JSON")
+        print(f"Aviso: {path} deve conter um objeto JSON")
+        return {}
+    return parse_values(raw, path, strict)
+
+
+def read_env(environ=None):
+    """Lê os campos definidos por variáveis de ambiente IFPB_*"""
+    environ = os.environ if environ is None else environ
+    raw = {}
+    for name in Settings._fields:
+        key = ENV_PREFIX + name.upper()
+        if key in environ:
+            raw[name] = environ[key]
+    return parse_values(raw, "ambiente")
+
+
+def load_settings(path=SETTINGS_FILE, overrides=None, strict=False):
+    """Carrega a configuração uma vez e devolve o snapshot"""
+    values = read_file(path, strict)
+    values.update(read_env())
+    values.update(overrides or {})
+    return Settings(**values)
+
+
+def changed_fields(old, new):
+    """Conjunto de campos que diferem entre dois snapshots"""
+    return {name for name in Settings._fields if getattr(old, name) != getattr(new, name)}
+
+
+class SettingsManager:
+    """Mantém o snapshot atual e o troca atomicamente ao recarregar"""
+
+    def __init__(self, path=SETTINGS_FILE):
+        self.path = path
+        self.overrides = {}  # valores recebidos por MQTT (não persistidos)
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.file_mtime = self.get_mtime()
+        self.current = load_settings(self.path)
+        self.watcher = None
+        self.stop_event = threading.Event()
+
+    def add_listener(self, callback):
+        """Registra callback(old, new, changed) chamado a cada mudança"""
+        self.listeners.append(callback)
+
+    def get_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def reload(self):
+        """Relê arquivo e ambiente; notifica se algo mudou.
+        Se o arquivo estiver com erro, mantém a configuração atual."""
+        with self.lock:
+            old = self.current
+            try:
+                new = load_settings(self.path, self.overrides, strict=True)
+            except SettingsError as e:
+                print(f"Aviso: {e}; mantendo a configuração atual")
+                return set()
+            changed = changed_fields(old, new)
+            if not changed:
+                return set()
+            self.current = new  # troca atômica: leitores veem o snapshot antigo ou o novo
+            print(f"Configuração recarregada: {', '.join(sorted(changed))}")
+            # Notifica ainda sob o lock: duas recargas simultâneas (watcher e MQTT)
+            # entregam seus snapshots aos listeners na mesma ordem em que trocaram
+            # self.current. Os listeners devem apenas agendar o trabalho.
+            for callback in self.listeners:
+                try:
+                    callback(old, new, changed)
+                except Exception as e:
+                    print(f"Erro ao aplicar configuração: {e}")
+        return changed
+
+    def apply_override(self, payload):
+        """Aplica valores recebidos por MQTT (JSON); {"reload": true} apenas relê o arquivo"""
+        try:
+            raw = json.loads(payload)
+        except ValueError as e:
+            print(f"Aviso: comando de configuração inválido: {e}")
+            return set()
+        if not isinstance(raw, dict):
+            print("Aviso: comando de configuração deve ser um objeto JSON")
+            return set()
+        raw.pop("reload", None)
+        if raw.pop("reset", False):
+            with self.lock:
+                self.overrides = {}
+        for name in sorted(set(raw) - MQTT_ALLOWED_FIELDS):
+            if name in Settings._fields:
+                print(f"Aviso: {name} não pode ser alterado por MQTT")
+                del raw[name]
+        values = parse_values(raw, "MQTT")
+        with self.lock:
+            self.overrides.update(values)
+        return self.reload()
+
+    def start_watcher(self, interval=WATCH_INTERVAL):
+        """Verifica periodicamente se o arquivo mudou (thread leve, sem dependências)"""
+        def watch():
+            while not self.stop_event.wait(interval):
+                mtime = self.get_mtime()
+                if mtime != self.file_mtime:
+                    self.file_mtime = mtime
+                    try:
+                        self.reload()
+                    except Exception as e:
+                        # A thread precisa sobreviver: senão as próximas edições seriam ignoradas
+                        print(f"Erro ao recarregar configuração: {e}")
+
+        self.watcher = threading.Thread(target=watch, daemon=True)
+        self.watcher.start()
+
+    def stop_watcher(self):
+        self.stop_event.set()
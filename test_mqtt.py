@@ -3,45 +3,241 @@
 """
 Script auxiliar para testar o envio de mensagens MQTT
 Útil para verificar se a integração MQTT está funcionando
+
+Também funciona como gerador de carga: simula N salas (clientes com
+conexão persistente) enviando M mensagens por segundo e mede a latência
+fim a fim pelo eco que o screensaver publica no tópico de status.
 """
 
-import paho.mqtt.client as mqtt
+import argparse
+import itertools
+import json
 import sys
+import threading
+import time
 
-MQTT_BROKER = "200.129.71.149"
-MQTT_PORT = 1883
-MQTT_TOPIC = "ifpb/sala01/mensagens"
-MQTT_USERNAME = "iot"
-MQTT_PASSWORD = "123"
-def main():
-    if len(sys.argv) < 2:
-        print("Uso: python test_mqtt.py <mensagem>")
-        print("Exemplo: python test_mqtt.py 'Aula de Matemática começou!'")
-        print("\nOu execute no terminal:")
-        print("  python test_mqtt.py \"Sua mensagem aqui\"")
+import paho.mqtt.client as mqtt
+
+from settings import load_settings
+
+CONNECT_TIMEOUT = 10  # segundos para todos os clientes conectarem
+
+
+def rate_list(value):
+    """Converte "5,10,20" na lista de taxas (todas > 0)"""
+    try:
+        rates = [float(r) for r in value.split(",") if r.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"taxa inválida: {value!r}")
+    if not rates or any(rate <= 0 for rate in rates):
+        raise argparse.ArgumentTypeError("as taxas devem ser maiores que zero")
+    return rates
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Envia mensagens MQTT para o screensaver IFPB (ou gera carga)"
+    )
+    parser.add_argument("mensagem", nargs="*", help="mensagem a enviar (modo simples)")
+    parser.add_argument("--carga", action="store_true", help="modo de teste de carga")
+    parser.add_argument("--salas", type=int, default=10, help="clientes simultâneos (padrão: 10)")
+    parser.add_argument("--taxa", type=rate_list, default="10",
+                        help="mensagens/s no total; lista para rampa, ex.: 5,10,20,50")
+    parser.add_argument("--duracao", type=float, default=10, help="segundos por etapa (padrão: 10)")
+    parser.add_argument("--tamanho", type=int, default=100, help="bytes por mensagem (padrão: 100)")
+    parser.add_argument("--qos", type=int, choices=(0, 1, 2), default=0)
+    parser.add_argument("--espera", type=float, default=5, help="segundos aguardando ecos ao final")
+    parser.add_argument("--broker", help="endereço do broker (padrão: configuração)")
+    parser.add_argument("--porta", type=int, help="porta do broker (padrão: configuração)")
+    parser.add_argument("--topico", help="tópico das mensagens (padrão: configuração)")
+    args = parser.parse_args(argv)
+    if args.salas < 1:
+        parser.error("--salas deve ser pelo menos 1")
+    return args
+
+
+def make_client(config, client_id=""):
+    """Cria um cliente conectado (loop em thread própria)"""
+    client = mqtt.Client(client_id=client_id)
+    client.username_pw_set(config.mqtt_username, config.mqtt_password)
+    connected = threading.Event()
+    client.on_connect = lambda c, userdata, flags, rc: rc == 0 and connected.set()
+    client.connect(config.mqtt_broker, config.mqtt_port, 60)
+    client.loop_start()
+    return client, connected
+
+
+def percentile(values, fraction):
+    """Percentil simples (valores já ordenados)"""
+    if not values:
+        return float('nan')
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+class LoadTest:
+    """Pool de clientes persistentes que publica sondas e coleta os ecos"""
+
+    def __init__(self, config, args):
+        self.config = config
+        self.args = args
+        self.topic = args.topico or config.mqtt_topic
+        self.lock = threading.Lock()
+        self.sent = {}  # id da sonda -> instante de envio
+        self.latencies = {}  # id da sonda -> latência (s)
+        self.pool = []
+        self.listener = None
+        self.counter = itertools.count()
+
+    def connect(self):
+        """Abre o cliente de eco e o pool de salas, aguardando todas as conexões"""
+        self.listener, listener_ready = make_client(self.config, "carga-eco")
+        self.listener.on_message = self.on_echo
+        pending = [listener_ready]
+        for i in range(self.args.salas):
+            client, ready = make_client(self.config, f"carga-sala{i + 1:02d}")
+            self.pool.append(client)
+            pending.append(ready)
+        deadline = time.monotonic() + CONNECT_TIMEOUT
+        for ready in pending:
+            if not ready.wait(max(0, deadline - time.monotonic())):
+                raise RuntimeError("Tempo esgotado conectando os clientes ao broker")
+        self.listener.subscribe(self.config.mqtt_status_topic, qos=self.args.qos)
+        print(f"{len(self.pool)} sala(s) conectada(s); ecos em '{self.config.mqtt_status_topic}'")
+
+    def on_echo(self, client, userdata, msg):
+        """Eco do screensaver: {"probe": id, "t": envio, "exibido": instante}"""
+        received = time.time()
+        try:
+            echo = json.loads(msg.payload.decode('utf-8'))
+            probe = echo["probe"]
+        except (ValueError, KeyError, TypeError):
+            return
+        with self.lock:
+            if probe in self.sent and probe not in self.latencies:
+                self.latencies[probe] = received - self.sent[probe]
+
+    def make_payload(self, probe, sent_at):
+        """Sonda JSON preenchida até o tamanho pedido"""
+        base = {"probe": probe, "t": sent_at, "texto": ""}
+        padding = max(0, self.args.tamanho - len(json.dumps(base)))
+        base["texto"] = "x" * padding
+        return json.dumps(base)
+
+    def run_stage(self, rate):
+        """Publica a `rate` mensagens/s durante a etapa; retorna os ids enviados"""
+        stage_ids = []
+        total = int(rate * self.args.duracao)
+        start = time.monotonic()
+        for i in range(total):
+            delay = start + i / rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            probe = f"{next(self.counter)}"
+            client = self.pool[i % len(self.pool)]
+            sent_at = time.time()
+            with self.lock:
+                self.sent[probe] = sent_at
+            client.publish(self.topic, self.make_payload(probe, sent_at), qos=self.args.qos)
+            stage_ids.append(probe)
+        elapsed = time.monotonic() - start
+        return stage_ids, elapsed
+
+    def report(self, rate, stage_ids, elapsed):
+        """Resume a etapa; retorna True se o screensaver acompanhou a taxa"""
+        with self.lock:
+            latencies = [self.latencies[p] for p in stage_ids if p in self.latencies]
+        ordered = sorted(latencies)
+        lost = len(stage_ids) - len(latencies)
+        print(f"\nTaxa alvo {rate:g} msg/s: {len(stage_ids)} enviadas em {elapsed:.1f} s "
+              f"({len(stage_ids) / elapsed if elapsed else 0:.1f} msg/s), "
+              f"{len(latencies)} ecos, {lost} sem eco")
+        if ordered:
+            print(f"  latência (ms): p50={percentile(ordered, 0.5) * 1000:.1f} "
+                  f"p95={percentile(ordered, 0.95) * 1000:.1f} "
+                  f"p99={percentile(ordered, 0.99) * 1000:.1f} "
+                  f"máx={ordered[-1] * 1000:.1f}")
+        # Atraso crescente ao longo da etapa indica fila acumulando no Tk
+        tenth = max(1, len(latencies) // 10)
+        first = sorted(latencies[:tenth])
+        last = sorted(latencies[-tenth:])
+        growing = bool(first and last) and percentile(last, 0.5) > 2 * percentile(first, 0.5) + 0.05
+        keeping_up = lost <= len(stage_ids) * 0.05 and not growing
+        if not keeping_up:
+            print("  ✗ screensaver não acompanha esta taxa (ecos perdidos ou atraso crescente)")
+        return keeping_up
+
+    def close(self):
+        for client in self.pool + [self.listener]:
+            if client:
+                client.loop_stop()
+                client.disconnect()
+
+
+def run_load(config, args):
+    """Executa o teste de carga (uma ou mais etapas de taxa)"""
+    test = LoadTest(config, args)
+    try:
+        test.connect()
+        for rate in args.taxa:
+            stage_ids, elapsed = test.run_stage(rate)
+            time.sleep(args.espera)
+            if not test.report(rate, stage_ids, elapsed):
+                print(f"\nLimite encontrado: display_message fica para trás a ~{rate:g} msg/s")
+                return 1
+        print("\n✓ Todas as etapas acompanhadas")
+        return 0
+    except Exception as e:
+        print(f"Erro: {e}")
         return 1
-    
-    message = " ".join(sys.argv[1:])
-    
+    finally:
+        test.close()
+
+
+def send_message(config, topic, message):
+    """Envia uma única mensagem (modo simples)"""
     client = mqtt.Client()
-    client.username_pw_set(MQTT_USERNAME, MQTT_PASSWORD)
+    client.username_pw_set(config.mqtt_username, config.mqtt_password)
     try:
-        print(f"Conectando ao broker {MQTT_BROKER}:{MQTT_PORT}...")
-        client.connect(MQTT_BROKER, MQTT_PORT, 60)
-        
-        print(f"Enviando mensagem para o tópico '{MQTT_TOPIC}'...")
-        client.publish(MQTT_TOPIC, message)
-        
+        print(f"Conectando ao broker {config.mqtt_broker}:{config.mqtt_port}...")
+        client.connect(config.mqtt_broker, config.mqtt_port, 60)
+
+        print(f"Enviando mensagem para o tópico '{topic}'...")
+        client.publish(topic, message)
+
         print(f"✓ Mensagem enviada: '{message}'")
         client.disconnect()
         return 0
-        
+
     except Exception as e:
         print(f"Erro: {e}")
         return 1
 
+
+def main():
+    args = parse_args(sys.argv[1:])
+    if not args.mensagem and not args.carga:
+        print("Uso: python test_mqtt.py <mensagem>")
+        print("Exemplo: python test_mqtt.py 'Aula de Matemática começou!'")
+        print("\nOu execute no terminal:")
+        print("  python test_mqtt.py \"Sua mensagem aqui\"")
+        print("\nTeste de carga (10 salas, rampa de taxas):")
+        print("  python test_mqtt.py --carga --salas 10 --taxa 5,10,20,50")
+        return 1
+
+    # Mesma configuração do screensaver (settings.json + variáveis IFPB_*)
+    overrides = {}
+    if args.broker:
+        overrides["mqtt_broker"] = args.broker
+    if args.porta:
+        overrides["mqtt_port"] = args.porta
+    config = load_settings(overrides=overrides)
+
+    if args.carga:
+        return run_load(config, args)
+    return send_message(config, args.topico or config.mqtt_topic, " ".join(args.mensagem))
+
 if __name__ == "__main__":
     exit_code = main()
     if exit_code:
         sys.exit(exit_code)
-
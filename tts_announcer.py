@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Anúncios falados para mensagens MQTT
+Sintetiza o texto com um motor TTS offline (espeak-ng) em um pool de
+threads e guarda o áudio em um cache em disco, já que os mesmos
+anúncios se repetem todos os dias.
+"""
+
+import hashlib
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Configurações
+TTS_ENGINES = ["espeak-ng", "espeak"]
+TTS_TIMEOUT = 20  # segundos para sintetizar uma frase
+
+
+def find_engine():
+    """Retorna o executável de TTS disponível no sistema, ou None"""
+    for engine in TTS_ENGINES:
+        path = shutil.which(engine)
+        if path:
+            return path
+    return None
+
+
+class PhraseCache:
+    """Cache em disco de frases sintetizadas, com remoção das menos usadas"""
+
+    def __init__(self, folder, max_bytes):
+        self.folder = Path(folder)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.folder.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, text, voice):
+        """Caminho do arquivo de áudio para o par (texto, voz)"""
+        key = hashlib.sha256(f"{voice}\0{text}".encode('utf-8')).hexdigest()
+        return self.folder / f"{key}.wav"
+
+    def get(self, text, voice):
+        """Retorna o arquivo em cache (e marca como usado) ou None"""
+        path = self.path_for(text, voice)
+        try:
+            os.utime(path)  # mtime serve como "último uso" para a remoção
+            return path
+        except FileNotFoundError:
+            return None
+
+    def evict(self, keep=None):
+        """Remove os arquivos usados há mais tempo até caber no limite (exceto `keep`)"""
+        with self.lock:
+            entries = []
+            total = 0
+            for path in self.folder.glob("*.wav"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue  # frase recém-sintetizada, prestes a tocar
+                try:
+                    path.unlink()
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+
+class TTSAnnouncer:
+    """Sintetiza anúncios em segundo plano e entrega o áudio a uma função de reprodução"""
+
+    def __init__(self, play, voice="pt-br", cache_folder="tts_cache",
+                 cache_max_bytes=50 * 1024 * 1024, workers=2):
+        self.play = play
+        self.voice = voice
+        self.engine = find_engine()
+        self.cache = PhraseCache(cache_folder, cache_max_bytes)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts")
+        self.pending = {}  # frases em síntese, para não sintetizar a mesma duas vezes
+        self.lock = threading.Lock()
+
+    def available(self):
+        """Indica se há um motor de TTS instalado"""
+        return self.engine is not None
+
+    def announce(self, text):
+        """Agenda o anúncio falado do texto (retorna imediatamente)"""
+        text = " ".join(text.split())
+        if not text or not self.available():
+            return
+        cached = self.cache.get(text, self.voice)
+        if cached:
+            self.executor.submit(self.safe_play, cached)
+            return
+        with self.lock:
+            if text in self.pending:
+                return
+            self.pending[text] = self.executor.submit(self.synthesize_and_play, text)
+
+    def synthesize_and_play(self, text):
+        """Executado no pool: sintetiza (se necessário) e reproduz"""
+        try:
+            path = self.synthesize(text)
+            if path:
+                self.safe_play(path)
+        finally:
+            with self.lock:
+                self.pending.pop(text, None)
+
+    def synthesize(self, text):
+        """Gera o WAV da frase no cache; retorna o caminho ou None"""
+        path = self.cache.path_for(text, self.voice)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            subprocess.run(
+                [self.engine, '-v', self.voice, '-w', str(tmp_path), '--', text],  # '--': texto nunca vira opção
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=TTS_TIMEOUT,
+                check=True
+            )
+            os.replace(tmp_path, path)  # só aparece no cache quando completo
+        except Exception as e:
+            print(f"Erro ao sintetizar anúncio: {e}")
+            try:
+                tmp_path.unlink()
+            except FileNotFoundError:
+                pass
+            return None
+        self.cache.evict(keep=path)
+        return path
+
+    def safe_play(self, path):
+        """Reproduz o arquivo sem deixar exceções escaparem do pool"""
+        try:
+            self.play(path)
+        except Exception as e:
+            print(f"Erro ao reproduzir anúncio: {e}")
+
+    def shutdown(self):
+        """Encerra o pool sem esperar sínteses pendentes"""
+        self.executor.shutdown(wait=False)